@@ -1,21 +1,39 @@
-import requests
+import asyncio
 import time
 import os 
 from dotenv import load_dotenv
+import http_client
+import instrumentation
 
 load_dotenv()
 
-transcript_endpoint = 'https://api.assemblyai.com/v2/transcript'
+# Overridable so the pipeline can be exercised against a local stub of the API
+ASSEMBLYAI_BASE_URL = os.getenv('ASSEMBLYAI_BASE_URL', 'https://api.assemblyai.com/v2').rstrip('/')
+upload_endpoint = f'{ASSEMBLYAI_BASE_URL}/upload'
+transcript_endpoint = f'{ASSEMBLYAI_BASE_URL}/transcript'
 headers = {
-    "authorization": os.getenv('ASSEMBLYAI_API_KEY')
+    "authorization": os.getenv('ASSEMBLYAI_API_KEY', '')
 }
 
 CHUNK_SIZE = 5_242_880  # 5MB
 
+# Polling starts fast and backs off, since short answers finish in a few seconds
+POLL_INITIAL_INTERVAL = float(os.getenv('ASSEMBLYAI_POLL_INITIAL', '1'))
+POLL_MAX_INTERVAL = float(os.getenv('ASSEMBLYAI_POLL_MAX', '10'))
+POLL_BACKOFF = 1.5
+# Keep "um"/"uh" in the word list so fluency metrics can count them
+TRANSCRIPT_OPTIONS = {'disfluencies': True}
+TRANSCRIPT_TIMEOUT = float(os.getenv('ASSEMBLYAI_TRANSCRIPT_TIMEOUT', '600'))
 
-def upload_to_assemblyai(file):
-    upload_endpoint = 'https://api.assemblyai.com/v2/upload'
 
+def _poll_intervals():
+    interval = POLL_INITIAL_INTERVAL
+    while True:
+        yield interval
+        interval = min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+
+
+def upload_to_assemblyai(file):
     def read_file(file_obj):
         while True:
             data = file_obj.read(CHUNK_SIZE)
@@ -23,19 +41,21 @@ def upload_to_assemblyai(file):
                 break
             yield data
 
-    response = requests.post(upload_endpoint, headers=headers, data=read_file(file))
+    # A streamed body can't be replayed, so the upload itself is not retried
+    with instrumentation.span("assemblyai_upload"):
+        response = http_client.request_sync('POST', upload_endpoint, headers=headers, content=read_file(file), retries=0)
     response.raise_for_status()
     return response.json()['upload_url']
 
 
 def transcribe_and_poll(audio_url):
-    transcript_request = {'audio_url': audio_url}
-    transcript_response = requests.post(transcript_endpoint, json=transcript_request, headers=headers)
+    transcript_request = {'audio_url': audio_url, **TRANSCRIPT_OPTIONS}
+    transcript_response = http_client.request_sync('POST', transcript_endpoint, json=transcript_request, headers=headers)
     transcript_response.raise_for_status()
     transcript_id = transcript_response.json()['id']
 
-    while True:
-        polling_response = requests.get(f'{transcript_endpoint}/{transcript_id}', headers=headers)
+    for interval in _poll_intervals():
+        polling_response = http_client.request_sync('GET', f'{transcript_endpoint}/{transcript_id}', headers=headers)
         polling_response.raise_for_status()
         result = polling_response.json()
 
@@ -43,4 +63,61 @@ def transcribe_and_poll(audio_url):
             return result['text']
         elif result['status'] == 'error':
             return f"Error: {result['error']}"
-        time.sleep(15)
\ No newline at end of file
+        time.sleep(interval)
+
+
+# --- Async variants used by the background transcription jobs ---
+
+async def upload_to_assemblyai_async(data: bytes) -> str:
+    with instrumentation.span("assemblyai_upload"):
+        response = await http_client.request('POST', upload_endpoint, headers=headers, content=data)
+    response.raise_for_status()
+    return response.json()['upload_url']
+
+
+async def request_transcript_async(audio_url: str, webhook_url: str = None) -> str:
+    transcript_request = {'audio_url': audio_url, **TRANSCRIPT_OPTIONS}
+    if webhook_url:
+        transcript_request['webhook_url'] = webhook_url
+    response = await http_client.request('POST', transcript_endpoint, headers=headers, json=transcript_request)
+    response.raise_for_status()
+    return response.json()['id']
+
+
+async def get_transcript_async(transcript_id: str) -> dict:
+    response = await http_client.request('GET', f'{transcript_endpoint}/{transcript_id}', headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+async def poll_transcript_async(transcript_id: str, wakeup: asyncio.Event = None) -> dict:
+    """
+    Poll until the transcript is completed or failed, backing off between polls.
+
+    If a wakeup event is given (set by the webhook handler), the next poll
+    happens as soon as AssemblyAI reports the transcript is ready.
+    """
+    started = time.monotonic()
+    deadline = started + TRANSCRIPT_TIMEOUT
+    queued = True
+    for interval in _poll_intervals():
+        result = await get_transcript_async(transcript_id)
+        if queued and result['status'] != 'queued':
+            # Time spent in AssemblyAI's queue, to the resolution of the polling interval
+            queued = False
+            instrumentation.observe("assemblyai_queue_wait", time.monotonic() - started)
+        if result['status'] in ('completed', 'error'):
+            instrumentation.observe("assemblyai_transcribe", time.monotonic() - started, error=result['status'] == 'error')
+            return result
+        if time.monotonic() > deadline:
+            instrumentation.observe("assemblyai_transcribe", time.monotonic() - started, error=True)
+            raise TimeoutError(f"Transcript {transcript_id} not ready after {TRANSCRIPT_TIMEOUT:.0f}s")
+
+        if wakeup is None:
+            await asyncio.sleep(interval)
+        else:
+            try:
+                await asyncio.wait_for(wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
\ No newline at end of file
@@ -1,10 +1,12 @@
 import google.generativeai as genai
-from google.generativeai.types import GenerationConfig
 import json
 from pydantic import BaseModel
 from typing import List
 import os
 from dotenv import load_dotenv
+from llm_cache import generate_text, EmptyResponseError
+import instrumentation
+from AudioAnalyser.services.fluency import fluency_summary
 
 # Load environment variables
 load_dotenv()
@@ -38,20 +40,19 @@ system_instruction_text = (
     "Your response must follow the provided JSON schema exactly."
 )
 
-def analyze_technical_answer(transcript_text: str) -> dict:
+def analyze_technical_answer(transcript_text: str, use_cache: bool = True, fluency: dict = None) -> dict:
     global last_analysis_result  # ✅ Ensure updates to the global variable
 
     try:
-        model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            system_instruction=system_instruction_text
-        )
-
         main_content_prompt = (
             f"Please evaluate the following technical answer. Analyze it for correctness, clarity, depth, and conciseness. "
             f"Provide the results in JSON format as per the schema.\n\n"
             f"Technical Answer:\n{transcript_text}"
         )
+        delivery = fluency_summary(fluency)
+        if delivery:
+            # Measured from the recording; the model should use these rather than guess delivery from text
+            main_content_prompt += f"\n\nMeasured delivery: {delivery}"
 
         simplified_json_schema = {
             "type": "object",
@@ -78,37 +79,37 @@ def analyze_technical_answer(transcript_text: str) -> dict:
             "required": ["evaluation", "overall_summary", "actionable_suggestions"]
         }
 
-        response = model.generate_content(
-            contents=main_content_prompt,
-            generation_config=GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=simplified_json_schema,
-                temperature=0.5,
-                top_p=0.9,
-                max_output_tokens=2048,
-            )
+        response_text = generate_text(
+            model_name="gemini-2.5-flash",
+            prompt=main_content_prompt,
+            system_instruction=system_instruction_text,
+            generation_config={
+                "response_mime_type": "application/json",
+                "temperature": 0.5,
+                "top_p": 0.9,
+                "max_output_tokens": 2048,
+            },
+            response_schema=simplified_json_schema,
+            use_cache=use_cache,
+            validate=lambda text: TechnicalFeedback(**json.loads(text)),
         )
-
-        candidates = response.candidates
-        if not candidates or not candidates[0].content.parts:
-            finish_reason = candidates[0].finish_reason if candidates else 'No candidates'
-            print(f"❌ No valid response. Finish reason: {finish_reason}")
-            last_analysis_result = {"error": f"No valid response. Finish reason: {finish_reason}"}
-            return last_analysis_result
-
-        response_text = candidates[0].content.parts[0].text
         response_data = json.loads(response_text)
         feedback = TechnicalFeedback(**response_data)
         last_analysis_result = feedback.model_dump()  # ✅ Save result globally
         return last_analysis_result
 
+    except EmptyResponseError as e:
+        instrumentation.log(f"❌ {e}", level="error")
+        last_analysis_result = {"error": str(e)}
+        return last_analysis_result
+
     except json.JSONDecodeError as e:
-        print(f"❌ JSON Parsing Error: {e}")
+        instrumentation.log(f"❌ JSON Parsing Error: {e}", level="error")
         last_analysis_result = {"error": "Invalid JSON from Gemini."}
         return last_analysis_result
 
     except Exception as e:
-        print(f"❌ General Error: {e}")
+        instrumentation.log(f"❌ General Error: {e}", level="error")
         last_analysis_result = {"error": str(e)}
         return last_analysis_result
 
@@ -0,0 +1,121 @@
+# fluency.py
+#
+# Speech-delivery metrics computed locally from AssemblyAI's word array
+# (text, start/end in ms, confidence): speaking rate, pauses, filler words,
+# long silences and low-confidence stretches. Only the compact numbers are
+# passed on to the evaluation and report prompts.
+
+import os
+import re
+
+import numpy as np
+
+# Gaps between words at least this long count as pauses / long silences (seconds)
+FLUENCY_PAUSE_SECONDS = float(os.getenv("FLUENCY_PAUSE_SECONDS", "0.25"))
+FLUENCY_LONG_SILENCE_SECONDS = float(os.getenv("FLUENCY_LONG_SILENCE_SECONDS", "2.0"))
+# Rolling mean of word confidence below this marks a confidence dip
+FLUENCY_CONFIDENCE_DIP = float(os.getenv("FLUENCY_CONFIDENCE_DIP", "0.6"))
+FLUENCY_CONFIDENCE_WINDOW = 5
+# Longest event lists kept per answer
+FLUENCY_MAX_EVENTS = 5
+
+FILLER_WORDS = frozenset({"um", "umm", "uh", "uhh", "uhm", "er", "erm", "ah", "hmm", "mm", "mhm"})
+FILLER_PHRASES = (("you", "know"), ("i", "mean"), ("sort", "of"), ("kind", "of"))
+
+_WORD_PATTERN = re.compile(r"[^a-z']+")
+
+
+def _normalise_word(text):
+    return _WORD_PATTERN.sub("", text.lower())
+
+
+def _to_original_times(times, segments):
+    """Vectorised version of preprocessing.to_original_time for an array of seconds."""
+    if not segments:
+        return times
+    table = np.asarray(segments, dtype=np.float64)
+    index = np.maximum(np.searchsorted(table[:, 2], times, side="right") - 1, 0)
+    return table[index, 0] + times - table[index, 2]
+
+
+def _runs(mask):
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def fluency_metrics(words, segments=None):
+    """
+    Metrics for one answer from its word list.
+
+    segments is the kept-segment map from preprocessing, if the audio was
+    trimmed; word times are mapped back through it first, so pauses are
+    measured against what the candidate actually said, not the trimmed upload.
+    """
+    if not words:
+        return {"word_count": 0}
+
+    starts = _to_original_times(np.array([w["start"] for w in words], dtype=np.float64) / 1000, segments)
+    ends = _to_original_times(np.array([w["end"] for w in words], dtype=np.float64) / 1000, segments)
+    confidence = np.array([w.get("confidence", 1.0) for w in words], dtype=np.float64)
+    tokens = [_normalise_word(w["text"]) for w in words]
+    n = len(words)
+
+    duration = max(ends[-1] - starts[0], 1e-6)
+    gaps = np.maximum(starts[1:] - ends[:-1], 0.0)
+    pauses = gaps[gaps >= FLUENCY_PAUSE_SECONDS]
+    # Articulation rate leaves the pauses out, speaking rate does not
+    speaking_time = max(duration - pauses.sum(), 1e-6)
+
+    is_filler = np.fromiter((token in FILLER_WORDS for token in tokens), dtype=bool, count=n)
+    phrase_count = sum(
+        1 for i in range(n - 1) if (tokens[i], tokens[i + 1]) in FILLER_PHRASES
+    )
+    filler_count = int(is_filler.sum()) + phrase_count
+
+    long_silences = np.flatnonzero(gaps >= FLUENCY_LONG_SILENCE_SECONDS)
+    longest = long_silences[np.argsort(-gaps[long_silences])][:FLUENCY_MAX_EVENTS]
+
+    dips = []
+    if n >= FLUENCY_CONFIDENCE_WINDOW:
+        window = np.ones(FLUENCY_CONFIDENCE_WINDOW) / FLUENCY_CONFIDENCE_WINDOW
+        rolling = np.convolve(confidence, window, mode="valid")
+        dip_starts, dip_ends = _runs(rolling < FLUENCY_CONFIDENCE_DIP)
+        for start, end in list(zip(dip_starts, dip_ends))[:FLUENCY_MAX_EVENTS]:
+            last_word = end + FLUENCY_CONFIDENCE_WINDOW - 2
+            dips.append({
+                "at": round(float(starts[start]), 1),
+                "duration": round(float(ends[last_word] - starts[start]), 1),
+                "text": " ".join(w["text"] for w in words[start:last_word + 1]),
+            })
+
+    return {
+        "word_count": n,
+        "duration_seconds": round(float(duration), 1),
+        "words_per_minute": round(float(n / duration * 60), 1),
+        "articulation_rate": round(float(n / speaking_time * 60), 1),
+        "pause_count": int(len(pauses)),
+        "pause_ratio": round(float(pauses.sum() / duration), 3),
+        "pause_median_seconds": round(float(np.median(pauses)), 2) if len(pauses) else 0.0,
+        "pause_p90_seconds": round(float(np.percentile(pauses, 90)), 2) if len(pauses) else 0.0,
+        "longest_pause_seconds": round(float(gaps.max()), 2) if len(gaps) else 0.0,
+        "filler_count": filler_count,
+        "fillers_per_100_words": round(filler_count / n * 100, 1),
+        "long_silences": [{"at": round(float(ends[i]), 1), "duration": round(float(gaps[i]), 1)}
+                          for i in sorted(longest)],
+        "mean_confidence": round(float(confidence.mean()), 3),
+        "low_confidence_share": round(float((confidence < FLUENCY_CONFIDENCE_DIP).mean()), 3),
+        "confidence_dips": dips,
+    }
+
+
+def fluency_summary(metrics):
+    """One line of the headline numbers, for prompts."""
+    if not metrics or not metrics.get("word_count"):
+        return ""
+    return (
+        f"{metrics['words_per_minute']:g} wpm ({metrics['articulation_rate']:g} excluding pauses), "
+        f"{metrics['pause_count']} pauses (median {metrics['pause_median_seconds']:g}s, longest {metrics['longest_pause_seconds']:g}s), "
+        f"{len(metrics['long_silences'])} silences over {FLUENCY_LONG_SILENCE_SECONDS:g}s, "
+        f"{metrics['fillers_per_100_words']:g} fillers/100 words, "
+        f"mean ASR confidence {metrics['mean_confidence']:.2f} with {len(metrics['confidence_dips'])} low-confidence stretches"
+    )
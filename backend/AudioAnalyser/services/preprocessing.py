@@ -0,0 +1,174 @@
+# preprocessing.py
+#
+# Shrinks an answer recording before it is uploaded for transcription:
+# decode with ffmpeg to 16 kHz mono PCM, cut leading/trailing silence and
+# shorten long pauses with a frame-energy detector, then re-encode as Opus.
+# The kept segments are returned so transcript timestamps can be mapped back
+# to the original recording.
+
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import instrumentation
+
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "true").lower() == "true"
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", "60"))
+
+SAMPLE_RATE = 16000
+# Opus at this bitrate is transparent for speech recognition
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+
+# Energy detector: 30 ms frames; a frame is speech when it is this many dB above
+# the recording's noise floor and above an absolute floor (dBFS). The noise floor
+# is capped at VAD_MIN_DBFS + VAD_MARGIN_DB, so a recording with no quiet frames
+# (continuous speech or tone) is not measured against itself
+VAD_FRAME_MS = 30
+VAD_MARGIN_DB = float(os.getenv("AUDIO_VAD_MARGIN_DB", "12"))
+VAD_MIN_DBFS = float(os.getenv("AUDIO_VAD_MIN_DBFS", "-55"))
+# Speech runs shorter than this are treated as clicks/noise
+VAD_MIN_SPEECH_MS = int(os.getenv("AUDIO_VAD_MIN_SPEECH_MS", "90"))
+# Silence kept around speech, and the longest pause left inside an answer
+VAD_PADDING_MS = int(os.getenv("AUDIO_VAD_PADDING_MS", "200"))
+VAD_MAX_PAUSE_MS = int(os.getenv("AUDIO_VAD_MAX_PAUSE_MS", "700"))
+
+
+class AudioPreprocessingError(RuntimeError):
+    """ffmpeg is missing or could not decode/encode the recording."""
+
+
+def _ffmpeg(args, data):
+    if shutil.which(FFMPEG_BINARY) is None:
+        raise AudioPreprocessingError(f"{FFMPEG_BINARY} not found; install ffmpeg or set FFMPEG_BINARY.")
+    try:
+        result = subprocess.run(
+            [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", *args],
+            input=data, capture_output=True, timeout=FFMPEG_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        raise AudioPreprocessingError(f"ffmpeg timed out after {FFMPEG_TIMEOUT:.0f}s.")
+    if result.returncode != 0:
+        raise AudioPreprocessingError(f"ffmpeg failed: {result.stderr.decode(errors='replace').strip()[-300:]}")
+    return result.stdout
+
+
+def decode_audio(audio_bytes):
+    """Any container/codec ffmpeg understands -> float32 mono samples at 16 kHz."""
+    pcm = _ffmpeg(["-i", "pipe:0", "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"], audio_bytes)
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def encode_opus(samples):
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+    return _ffmpeg([
+        "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+        "-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1",
+    ], pcm)
+
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array, end exclusive."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def speech_segments(samples, sample_rate=SAMPLE_RATE):
+    """
+    Sample ranges to keep, as an (n, 2) array of [start, end).
+
+    Frames are scored by RMS energy in one vectorised pass; runs of speech are
+    padded, and pauses between them longer than VAD_MAX_PAUSE_MS are cut down.
+    """
+    frame = sample_rate * VAD_FRAME_MS // 1000
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    noise_floor = min(np.percentile(energy_db, 10), VAD_MIN_DBFS + VAD_MARGIN_DB)
+    speech = energy_db > max(noise_floor + VAD_MARGIN_DB, VAD_MIN_DBFS)
+
+    # Drop speech runs too short to be words
+    starts, ends = _runs(speech)
+    for start, end in zip(starts, ends):
+        if (end - start) * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+            speech[start:end] = False
+    starts, ends = _runs(speech)
+    if len(starts) == 0:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    # Pad each run, then merge runs whose gap is within the pause allowance
+    pad = VAD_PADDING_MS // VAD_FRAME_MS
+    max_gap = max(VAD_MAX_PAUSE_MS // VAD_FRAME_MS - 2 * pad, 0)
+    starts = np.maximum(starts - pad, 0)
+    ends = np.minimum(ends + pad, n_frames)
+    keep = np.concatenate(([True], starts[1:] - ends[:-1] > max_gap))
+    merged_starts = starts[keep]
+    merged_ends = np.concatenate((ends[np.flatnonzero(keep)[1:] - 1], [ends[-1]]))
+
+    segments = np.stack([merged_starts, merged_ends], axis=1).astype(np.int64) * frame
+    # The last frame's tail is partial audio left over by the framing
+    if segments[-1, 1] == n_frames * frame:
+        segments[-1, 1] = len(samples)
+    return segments
+
+
+def trim_silence(samples, sample_rate=SAMPLE_RATE):
+    """Return (trimmed samples, segments) where segments are [original_start, original_end, trimmed_start] in seconds."""
+    ranges = speech_segments(samples, sample_rate)
+    if len(ranges) == 0:
+        return samples[:0], []
+    trimmed = np.concatenate([samples[start:end] for start, end in ranges])
+    offsets = np.concatenate(([0], np.cumsum(ranges[:, 1] - ranges[:, 0])[:-1]))
+    segments = [[round(start / sample_rate, 3), round(end / sample_rate, 3), round(offset / sample_rate, 3)]
+                for (start, end), offset in zip(ranges.tolist(), offsets.tolist())]
+    return trimmed, segments
+
+
+def to_original_time(seconds, segments):
+    """Map a time in the trimmed audio back to the original recording."""
+    if not segments:
+        return seconds
+    index = int(np.searchsorted([segment[2] for segment in segments], seconds, side="right")) - 1
+    start, _, trimmed_start = segments[max(index, 0)]
+    return start + seconds - trimmed_start
+
+
+def preprocess_audio(audio_bytes):
+    """
+    Return (bytes to upload, stats).
+
+    stats holds the original and processed sizes, bytes saved, original and
+    speech durations and the kept segments. When preprocessing is disabled,
+    fails, or would not make the upload smaller, the original bytes are
+    returned and stats["skipped"] says why.
+    """
+    stats = {"original_bytes": len(audio_bytes)}
+    if not AUDIO_PREPROCESS:
+        return audio_bytes, {**stats, "skipped": "disabled"}
+
+    try:
+        samples = decode_audio(audio_bytes)
+        trimmed, segments = trim_silence(samples)
+        stats["original_duration"] = round(len(samples) / SAMPLE_RATE, 2)
+        stats["speech_duration"] = round(len(trimmed) / SAMPLE_RATE, 2)
+        if not segments:
+            # Let the transcriber have the final say on a recording with no detected speech
+            return audio_bytes, {**stats, "skipped": "no speech detected"}
+
+        encoded = encode_opus(trimmed)
+    except AudioPreprocessingError as e:
+        instrumentation.log(f"❌ Audio preprocessing skipped: {e}", level="error")
+        return audio_bytes, {**stats, "skipped": str(e)}
+
+    if len(encoded) >= len(audio_bytes):
+        return audio_bytes, {**stats, "skipped": "not smaller"}
+    return encoded, {
+        **stats,
+        "processed_bytes": len(encoded),
+        "bytes_saved": len(audio_bytes) - len(encoded),
+        "segments": segments,
+    }
@@ -0,0 +1,157 @@
+# transcription_jobs.py
+#
+# Background transcription jobs. Job records live in session_store, so any
+# worker sharing the store can report a job's status; the job itself runs on
+# the worker that accepted the upload.
+
+import os
+import time
+import uuid
+import asyncio
+from datetime import datetime
+
+import session_store
+import instrumentation
+from AudioAnalyser.services.audio_transcript import (
+    upload_to_assemblyai_async,
+    request_transcript_async,
+    poll_transcript_async,
+)
+from AudioAnalyser.services.evaluation import analyze_technical_answer
+from AudioAnalyser.services.preprocessing import preprocess_audio
+from AudioAnalyser.services.fluency import fluency_metrics
+
+# Public URL of /assemblyai-webhook; when unset, jobs rely on polling alone
+ASSEMBLYAI_WEBHOOK_URL = os.getenv('ASSEMBLYAI_WEBHOOK_URL', '')
+
+# Seconds between store reads while streaming a job's events; changes made on
+# this worker are pushed immediately, other workers' are picked up by polling
+JOB_EVENTS_POLL_INTERVAL = float(os.getenv('TRANSCRIPTION_JOB_POLL_INTERVAL', '0.5'))
+
+TERMINAL_STATUSES = ('completed', 'error')
+
+jobs = {}            # job_id -> record of a job running on this worker (the store holds every job)
+_listeners = {}      # job_id -> [asyncio.Event] set when this worker updates the job
+_wakeups = {}        # AssemblyAI transcript id -> asyncio.Event set by the webhook
+_tasks = set()       # keeps running jobs referenced until they finish
+
+
+def _update(job_id, **changes):
+    job = jobs[job_id]
+    job.update(changes, updated_at=time.time())
+    session_store.save_job(job)
+    if job['status'] in TERMINAL_STATUSES:
+        del jobs[job_id]
+    for event in _listeners.get(job_id, []):
+        event.set()
+
+
+def get_job(job_id):
+    return session_store.get_job(job_id)
+
+
+def submit_job(audio_bytes: bytes, session_id: str) -> dict:
+    """Register a transcription job for a session and start it in the background. Returns the new job record."""
+    job_id = uuid.uuid4().hex
+    jobs[job_id] = {
+        'job_id': job_id,
+        'session_id': session_id,
+        'status': 'queued',
+        'timestamp': datetime.utcnow().isoformat(),
+        'transcription': None,
+        'analysis': None,
+        'audio': None,
+        'fluency': None,
+        'error': None,
+        'updated_at': time.time(),
+    }
+    session_store.save_job(jobs[job_id])
+
+    task = asyncio.create_task(_run_job(job_id, audio_bytes))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return get_job(job_id)
+
+
+async def _run_job(job_id, audio_bytes):
+    try:
+        # Decode, trim silence and re-encode, so less audio is uploaded and transcribed
+        _update(job_id, status='preprocessing')
+        with instrumentation.span("audio_preprocess"):
+            audio_bytes, audio_stats = await asyncio.to_thread(preprocess_audio, audio_bytes)
+        # The segment map is only needed here, to map word timestamps; it is not logged or stored
+        audio_summary = {k: v for k, v in audio_stats.items() if k != 'segments'}
+        if 'bytes_saved' in audio_stats:
+            instrumentation.count("audio_bytes_saved", audio_stats['bytes_saved'])
+            instrumentation.log(f"🎙️ Job {job_id}: {audio_stats['bytes_saved']} bytes saved, "
+                                f"{audio_stats['speech_duration']}s of {audio_stats['original_duration']}s kept",
+                                job_id=job_id, **audio_summary)
+        _update(job_id, status='uploading', audio=audio_summary)
+
+        audio_url = await upload_to_assemblyai_async(audio_bytes)
+
+        _update(job_id, status='transcribing')
+        transcript_id = await request_transcript_async(audio_url, ASSEMBLYAI_WEBHOOK_URL or None)
+        _wakeups[transcript_id] = asyncio.Event()
+        try:
+            result = await poll_transcript_async(transcript_id, _wakeups[transcript_id])
+        finally:
+            _wakeups.pop(transcript_id, None)
+
+        if result['status'] == 'error':
+            _update(job_id, status='error', error=result.get('error'))
+            return
+
+        transcript_text = result['text']
+        # Delivery metrics come from the word timestamps, measured on the original (untrimmed) timeline
+        fluency = fluency_metrics(result.get('words') or [], audio_stats.get('segments'))
+        _update(job_id, status='evaluating', transcription=transcript_text, fluency=fluency)
+        analysis_result = await asyncio.to_thread(analyze_technical_answer, transcript_text, fluency=fluency)
+
+        # Save transcript & analysis under the job's timestamp entry (no overwrite)
+        job = jobs[job_id]
+        session_store.save(job['session_id'], "audio_transcripts", {
+            "transcription": transcript_text,
+            "analysis": analysis_result,
+            "fluency": fluency,
+            "audio": audio_summary,
+        }, entry=job['timestamp'])
+        _update(job_id, status='completed', analysis=analysis_result)
+
+    except Exception as e:
+        instrumentation.log(f"❌ Transcription job {job_id} failed: {e}", level="error", job_id=job_id)
+        _update(job_id, status='error', error=str(e))
+
+
+def notify_transcript_ready(transcript_id):
+    """Called from the webhook: wake the job waiting on this transcript."""
+    event = _wakeups.get(transcript_id)
+    if event is not None:
+        event.set()
+    return event is not None
+
+
+async def job_events(job_id):
+    """Yield a snapshot of the job every time it changes, ending once it is finished."""
+    changed = asyncio.Event()
+    _listeners.setdefault(job_id, []).append(changed)
+    try:
+        last_update = None
+        while True:
+            changed.clear()
+            job = await asyncio.to_thread(get_job, job_id)
+            if job is None:
+                break
+            if job['updated_at'] != last_update:
+                last_update = job['updated_at']
+                yield job
+                if job['status'] in TERMINAL_STATUSES:
+                    break
+            try:
+                await asyncio.wait_for(changed.wait(), JOB_EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _listeners[job_id].remove(changed)
+        if not _listeners[job_id]:
+            del _listeners[job_id]
@@ -1,11 +1,11 @@
 import google.generativeai as genai
-from google.generativeai.types import GenerationConfig
-from ddgs import DDGS
 import json
 from pydantic import BaseModel
 from typing import List
 import os
 from dotenv import load_dotenv
+from llm_cache import generate_text, EmptyResponseError
+from QuestionGeneration.search_context import get_search_context
 
 # Load environment variables
 load_dotenv()
@@ -16,99 +16,99 @@ if not api_key:
 
 genai.configure(api_key=api_key)
 
-# Global variable to store last generated questions
-last_questions_result = None
-
 # Pydantic Schema
-class QuestionSet(BaseModel):
-    questions: List[str]
+class BankQuestion(BaseModel):
+    text: str
+    difficulty: str
+
+class QuestionBatch(BaseModel):
+    questions: List[BankQuestion]
     summary: str
 
+DIFFICULTIES = ("easy", "medium", "hard")
+
+# What each question-bank category asks the model for
+CATEGORY_INSTRUCTIONS = {
+    "technical": "technical interview questions covering theory, system design and coding problems",
+    "behavioral": "behavioral interview questions about teamwork, conflict, ownership, failure and growth, "
+                  "answerable with the STAR method",
+}
+
 # System instruction for Gemini
 system_instruction_text = (
     "You are an experienced technical interviewer. Based on the context provided, generate a list of potential interview questions "
     "that assess key skills, concepts, and problem-solving ability for the given role and company. The tone should be professional."
 )
 
-def generate_interview_questions(details: dict) -> dict:
-    global last_questions_result
+def generate_question_batch(details: dict, category: str, count: int = 15, use_cache: bool = True) -> dict:
+    """
+    Generate a batch of questions for the question bank, each tagged easy/medium/hard.
 
-    # Extract necessary fields safely
+    details needs a job role; company and description are optional so that
+    generic per-role banks can be filled offline.
+    """
     role = details.get('job_role') or details.get('role') or ''
     company = details.get('company_name') or details.get('company') or ''
     job_description = details.get('job_description', '')
-    other_details = details.get('other_details', '')
 
-    if not role or not company:
-        last_questions_result = {"error": "Missing job role or company name."}
-        return last_questions_result
+    if not role:
+        return {"error": "Missing job role."}
+    if category not in CATEGORY_INSTRUCTIONS:
+        return {"error": f"Unknown question category '{category}'."}
 
     try:
-        # Step 1: Search online using DDGS
-        query = f"{role} interview questions at {company}"
-        with DDGS() as ddgs:
-            search_results_raw = ddgs.text(query, max_results=5)
-
-        search_context = "\n".join([item.get('body', '') for item in search_results_raw if item.get('body')])
-        if not search_context.strip():
-            search_context = "No significant online information found. Use general knowledge."
+        search_context = get_search_context(role, company) if company else "Use general knowledge."
 
-        # Step 2: Prepare full prompt
         prompt = (
             f"Job Role: {role}\n"
-            f"Company: {company}\n"
-            f"Job Description: {job_description}\n"
-            f"Additional Info: {other_details}\n\n"
+            f"Company: {company or 'Any company'}\n"
+            f"Job Description: {job_description or 'Not specified'}\n\n"
             f"Background Info from web:\n{search_context}\n\n"
-            f"Please generate 5 technical interview questions: 2 easy theory, 2 medium coding, 1 hard coding.\n"
+            f"Please generate {count} distinct {CATEGORY_INSTRUCTIONS[category]}.\n"
+            f"Tag each with a difficulty of easy, medium or hard, with roughly equal numbers of each.\n"
             f"Also provide a short 2-3 sentence summary on the typical focus of interviews for this role.\n"
             f"Return strictly in this JSON format:\n"
-            f'{{"questions": ["question1", "question2", ...], "summary": "summary text"}}'
+            f'{{"questions": [{{"text": "question", "difficulty": "easy"}}, ...], "summary": "summary text"}}'
         )
 
-        # Step 3: Define expected schema
         simplified_json_schema = {
             "type": "object",
             "properties": {
-                "questions": {"type": "array", "items": {"type": "string"}},
+                "questions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "text": {"type": "string"},
+                            "difficulty": {"type": "string", "enum": list(DIFFICULTIES)}
+                        },
+                        "required": ["text", "difficulty"]
+                    }
+                },
                 "summary": {"type": "string"}
             },
             "required": ["questions", "summary"]
         }
 
-        # Step 4: Gemini API call
-        model = genai.GenerativeModel(
+        response_text = generate_text(
             model_name="gemini-2.5-flash",
-            system_instruction=system_instruction_text
-        )
-
-        response = model.generate_content(
-            contents=prompt,
-            generation_config=GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=simplified_json_schema,
-                temperature=0.5,
-                top_p=0.9,
-                max_output_tokens=2048,
-            )
+            prompt=prompt,
+            system_instruction=system_instruction_text,
+            generation_config={
+                "response_mime_type": "application/json",
+                "temperature": 0.8,
+                "top_p": 0.95,
+                "max_output_tokens": 4096,
+            },
+            response_schema=simplified_json_schema,
+            use_cache=use_cache,
+            validate=lambda text: QuestionBatch(**json.loads(text)),
         )
+        return QuestionBatch(**json.loads(response_text)).model_dump()
 
-        candidates = response.candidates
-        if not candidates or not candidates[0].content.parts:
-            finish_reason = candidates[0].finish_reason if candidates else 'No candidates'
-            last_questions_result = {"error": f"No valid response. Finish reason: {finish_reason}"}
-            return last_questions_result
-
-        response_text = candidates[0].content.parts[0].text
-        response_data = json.loads(response_text)
-        validated = QuestionSet(**response_data)
-
-        last_questions_result = validated.model_dump()
-        return last_questions_result
-
+    except EmptyResponseError as e:
+        return {"error": str(e)}
     except json.JSONDecodeError as e:
-        last_questions_result = {"error": f"Invalid JSON from Gemini: {str(e)}"}
-        return last_questions_result
+        return {"error": f"Invalid JSON from Gemini: {str(e)}"}
     except Exception as e:
-        last_questions_result = {"error": str(e)}
-        return last_questions_result
+        return {"error": str(e)}
@@ -0,0 +1,301 @@
+# question_bank.py
+#
+# Pre-generated interview questions, stored in SQLite by (role, company,
+# category) with a difficulty tag and an embedding. Requests are served from
+# the bank without repeating a question within a session; a bank that runs low
+# is refilled in the background, and only an empty bank generates on demand.
+# Fill it offline from a catalogue with: python -m QuestionGeneration.question_bank
+
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+import instrumentation
+from QuestionGeneration.context_generation import generate_question_batch, DIFFICULTIES, CATEGORY_INSTRUCTIONS
+from ReportGeneration.EmbeddingGeneration.engine import EmbeddingEngine, gemini_embed
+
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH", "question_bank.sqlite3")
+QUESTION_BANK_CATALOGUE = os.getenv(
+    "QUESTION_BANK_CATALOGUE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogue.json")
+)
+# Questions generated per model call
+QUESTION_BANK_BATCH_SIZE = int(os.getenv("QUESTION_BANK_BATCH_SIZE", "15"))
+# Refill once a session has fewer unseen questions than this
+QUESTION_BANK_LOW_WATER = int(os.getenv("QUESTION_BANK_LOW_WATER", "10"))
+# New questions this similar to a stored one (cosine) are treated as duplicates
+QUESTION_BANK_DUP_THRESHOLD = float(os.getenv("QUESTION_BANK_DUP_THRESHOLD", "0.92"))
+# Longest a request waits for an on-demand fill when the bank is empty (seconds)
+QUESTION_BANK_FILL_TIMEOUT = float(os.getenv("QUESTION_BANK_FILL_TIMEOUT", "60"))
+# Served-question history is kept this long (seconds)
+QUESTION_BANK_HISTORY_TTL = float(os.getenv("QUESTION_BANK_HISTORY_TTL", "604800"))
+
+QUESTIONS_PER_REQUEST = 5
+# Difficulty mix per request, as the original prompt asked: 2 easy, 2 medium, 1 hard
+DIFFICULTY_PLAN = {"easy": 2, "medium": 2, "hard": 1}
+# "mixed" draws from both categories
+CATEGORY_PLAN = {
+    "technical": {"technical": 5},
+    "behavioral": {"behavioral": 5},
+    "mixed": {"technical": 3, "behavioral": 2},
+}
+GENERIC_COMPANY = ""
+
+
+def _normalise(text):
+    return " ".join((text or "").lower().split())
+
+
+def _details_key(details):
+    role = details.get('job_role') or details.get('role') or ''
+    company = details.get('company_name') or details.get('company') or ''
+    return _normalise(role), _normalise(company)
+
+
+class QuestionBank:
+    def __init__(self, path=QUESTION_BANK_PATH, embedder=None):
+        self._lock = threading.Lock()
+        self.embedder = embedder or EmbeddingEngine(
+            embed_fn=lambda texts: gemini_embed(texts, task_type="semantic_similarity"),
+            cache_key="question-bank",
+        )
+        self._refills = {}  # (role, company, category) -> Future
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="question-bank")
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                role TEXT NOT NULL,
+                company TEXT NOT NULL,
+                category TEXT NOT NULL,
+                difficulty TEXT NOT NULL,
+                text TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                UNIQUE (role, company, category, text_hash)
+            );
+            CREATE INDEX IF NOT EXISTS questions_lookup ON questions (role, company, category, difficulty);
+            CREATE TABLE IF NOT EXISTS summaries (
+                role TEXT NOT NULL,
+                company TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                PRIMARY KEY (role, company)
+            );
+            CREATE TABLE IF NOT EXISTS served (
+                session_id TEXT NOT NULL,
+                question_id INTEGER NOT NULL,
+                served_at REAL NOT NULL,
+                PRIMARY KEY (session_id, question_id)
+            );
+            CREATE INDEX IF NOT EXISTS served_at ON served (served_at);
+        """)
+        self.conn.commit()
+
+    # --- Filling ---
+
+    def _embed(self, texts):
+        try:
+            vectors = np.asarray(self.embedder.embed(texts), dtype=np.float32)
+            return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        except Exception as e:
+            # Exact-text dedupe still applies without embeddings
+            instrumentation.log(f"❌ Question embedding failed: {e}", level="error")
+            return None
+
+    def add_batch(self, role, company, category, batch):
+        """Store a generated batch, skipping exact and near-duplicate questions. Returns the number added."""
+        questions = [q for q in batch["questions"] if q["text"].strip() and q["difficulty"] in DIFFICULTIES]
+        if not questions:
+            return 0
+        vectors = self._embed([q["text"] for q in questions])
+
+        with self._lock:
+            stored = [np.frombuffer(blob, dtype=np.float32) for (blob,) in self.conn.execute(
+                "SELECT embedding FROM questions WHERE role = ? AND company = ? AND category = ? AND embedding IS NOT NULL",
+                (role, company, category),
+            )]
+            matrix = np.vstack(stored) if stored else np.zeros((0, vectors.shape[1] if vectors is not None else 0), np.float32)
+
+            added = 0
+            for i, question in enumerate(questions):
+                vector = vectors[i] if vectors is not None else None
+                if vector is not None and len(matrix) and float((matrix @ vector).max()) >= QUESTION_BANK_DUP_THRESHOLD:
+                    continue
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO questions (role, company, category, difficulty, text, text_hash, embedding, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (role, company, category, question["difficulty"], question["text"].strip(),
+                     hashlib.sha256(_normalise(question["text"]).encode()).hexdigest(),
+                     vector.tobytes() if vector is not None else None, time.time()),
+                )
+                if cursor.rowcount and vector is not None:
+                    matrix = np.vstack([matrix, vector]) if len(matrix) else vector[None, :]
+                added += cursor.rowcount
+            if batch.get("summary"):
+                self.conn.execute("INSERT OR REPLACE INTO summaries (role, company, summary) VALUES (?, ?, ?)",
+                                  (role, company, batch["summary"]))
+            self.conn.commit()
+        return added
+
+    def fill(self, details, category, count=QUESTION_BANK_BATCH_SIZE):
+        """Generate one batch for the details' role/company and store it. Returns the number added."""
+        role, company = _details_key(details)
+        # Fresh questions every time, so the LLM cache is bypassed
+        batch = generate_question_batch(details, category, count, use_cache=False)
+        if "error" in batch:
+            raise RuntimeError(batch["error"])
+        return self.add_batch(role, company, category, batch)
+
+    def refill_async(self, details, category):
+        """Queue a background fill for this bank unless one is already running."""
+        key = _details_key(details) + (category,)
+        with self._lock:
+            if key in self._refills:
+                return self._refills[key]
+            future = self._executor.submit(self._refill, key, details, category)
+            self._refills[key] = future
+            return future
+
+    def _refill(self, key, details, category):
+        try:
+            return self.fill(details, category)
+        except Exception as e:
+            instrumentation.log(f"❌ Question bank refill for {key} failed: {e}", level="error")
+            return 0
+        finally:
+            with self._lock:
+                self._refills.pop(key, None)
+
+    # --- Serving ---
+
+    def _unseen(self, session_id, role, company, category):
+        return self.conn.execute("""
+            SELECT id, text, difficulty FROM questions q
+            WHERE role = ? AND company = ? AND category = ?
+              AND NOT EXISTS (SELECT 1 FROM served s WHERE s.session_id = ? AND s.question_id = q.id)
+        """, (role, company, category, session_id)).fetchall()
+
+    def _pick(self, rows, count):
+        """Follow the difficulty plan where the stock allows, then fill up with whatever is left."""
+        random.shuffle(rows)
+        by_difficulty = {difficulty: [row for row in rows if row[2] == difficulty] for difficulty in DIFFICULTIES}
+        plan = {d: round(n * count / QUESTIONS_PER_REQUEST) for d, n in DIFFICULTY_PLAN.items()}
+        picked = []
+        for difficulty, wanted in plan.items():
+            picked += by_difficulty[difficulty][:wanted]
+        picked += [row for row in rows if row not in picked][:count - len(picked)]
+        picked = picked[:count]
+        # Easiest first
+        return sorted(picked, key=lambda row: DIFFICULTIES.index(row[2]))
+
+    def _select(self, session_id, role, company, category, count):
+        # The company's own bank first, topped up from the generic bank for the role
+        rows = self._unseen(session_id, role, company, category)
+        if len(rows) >= count:
+            return self._pick(rows, count), len(rows) - count
+        # Not enough company stock: pick from the company and generic rows together
+        if company != GENERIC_COMPANY:
+            rows += self._unseen(session_id, role, GENERIC_COMPANY, category)
+        return self._pick(rows, count), max(len(rows) - count, 0)
+
+    def serve(self, session_id, details, category="mixed"):
+        """
+        Return {"questions", "items", "summary", "category"} for a session,
+        never repeating a question the session has already been served.
+        """
+        if category not in CATEGORY_PLAN:
+            return {"error": f"Unknown question category '{category}'. Use {', '.join(CATEGORY_PLAN)}."}
+        role, company = _details_key(details)
+        if not role:
+            return {"error": "Missing job role."}
+
+        items = []
+        for bank_category, count in CATEGORY_PLAN[category].items():
+            with self._lock:
+                picked, remaining = self._select(session_id, role, company, bank_category, count)
+            if len(picked) < count:
+                # Miss: wait for a fill (joining one already running), then serve from what was added
+                try:
+                    self.refill_async(details, bank_category).result(timeout=QUESTION_BANK_FILL_TIMEOUT)
+                except FutureTimeoutError:
+                    instrumentation.log(f"❌ On-demand question generation timed out after {QUESTION_BANK_FILL_TIMEOUT:.0f}s",
+                                        level="error")
+                with self._lock:
+                    picked, remaining = self._select(session_id, role, company, bank_category, count)
+            if remaining < QUESTION_BANK_LOW_WATER:
+                self.refill_async(details, bank_category)
+            items += [{"id": row[0], "text": row[1], "difficulty": row[2], "category": bank_category} for row in picked]
+
+        if not items:
+            return {"error": "No questions available for this role yet."}
+
+        now = time.time()
+        with self._lock:
+            self.conn.executemany("INSERT OR IGNORE INTO served (session_id, question_id, served_at) VALUES (?, ?, ?)",
+                                  [(session_id, item["id"], now) for item in items])
+            self.conn.execute("DELETE FROM served WHERE served_at < ?", (now - QUESTION_BANK_HISTORY_TTL,))
+            self.conn.commit()
+            summary = self.conn.execute(
+                "SELECT summary FROM summaries WHERE role = ? AND company IN (?, ?) ORDER BY company = ? DESC LIMIT 1",
+                (role, company, GENERIC_COMPANY, company),
+            ).fetchone()
+
+        return {
+            "questions": [item["text"] for item in items],
+            "items": items,
+            "summary": summary[0] if summary else "",
+            "category": category,
+        }
+
+    def prefetch(self, details):
+        """Top up every category for a role/company in the background, e.g. when job info is saved."""
+        role, company = _details_key(details)
+        for category in CATEGORY_INSTRUCTIONS:
+            with self._lock:
+                stock = self.conn.execute(
+                    "SELECT COUNT(*) FROM questions WHERE role = ? AND company = ? AND category = ?",
+                    (role, company, category),
+                ).fetchone()[0]
+            if stock < QUESTION_BANK_LOW_WATER:
+                self.refill_async(details, category)
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+def get_question_bank():
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank()
+    return _bank
+
+
+def fill_from_catalogue(path=QUESTION_BANK_CATALOGUE, batches=1):
+    """Offline fill: `batches` model calls per (role, company, category) in the catalogue."""
+    with open(path, "r", encoding="utf-8") as f:
+        catalogue = json.load(f)
+    bank = get_question_bank()
+    for entry in catalogue:
+        details = {"job_role": entry["role"], "company_name": entry.get("company", GENERIC_COMPANY)}
+        for category in entry.get("categories", list(CATEGORY_INSTRUCTIONS)):
+            for _ in range(batches):
+                try:
+                    added = bank.fill(details, category)
+                    print(f"📚 {entry['role']} / {details['company_name'] or 'any company'} / {category}: {added} added")
+                except Exception as e:
+                    instrumentation.log(f"❌ {entry['role']} / {category}: {e}", level="error")
+
+
+# Entry point: python -m QuestionGeneration.question_bank
+if __name__ == "__main__":
+    fill_from_catalogue()
@@ -0,0 +1,105 @@
+# search_context.py
+#
+# Web-search background for question generation, cached per normalised
+# (role, company). Searches run on a small thread pool, so they never block
+# the event loop, can be prefetched when the job info is saved, and are cut
+# off after a hard timeout in favour of general knowledge.
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from ddgs import DDGS
+
+import instrumentation
+
+SEARCH_CONTEXT_TTL = float(os.getenv("SEARCH_CONTEXT_TTL", "86400"))
+SEARCH_CONTEXT_MAX_ENTRIES = int(os.getenv("SEARCH_CONTEXT_MAX_ENTRIES", "256"))
+# Seconds a caller waits for a search before falling back
+SEARCH_CONTEXT_TIMEOUT = float(os.getenv("SEARCH_CONTEXT_TIMEOUT", "5"))
+SEARCH_CONTEXT_WORKERS = int(os.getenv("SEARCH_CONTEXT_WORKERS", "4"))
+SEARCH_MAX_RESULTS = 5
+
+FALLBACK_CONTEXT = "No significant online information found. Use general knowledge."
+
+_cache = OrderedDict()   # key -> (expires_at, context)
+_pending = {}            # key -> Future of a running search
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=SEARCH_CONTEXT_WORKERS, thread_name_prefix="search")
+
+
+def _key(role, company):
+    return (" ".join(role.lower().split()), " ".join(company.lower().split()))
+
+
+def _search(key, role, company):
+    query = f"{role} interview questions at {company}"
+    try:
+        with instrumentation.span("web_search"), DDGS() as ddgs:
+            search_results_raw = ddgs.text(query, max_results=SEARCH_MAX_RESULTS)
+        search_context = "\n".join([item.get('body', '') for item in search_results_raw if item.get('body')])
+        if not search_context.strip():
+            search_context = FALLBACK_CONTEXT
+        with _lock:
+            _cache[key] = (time.time() + SEARCH_CONTEXT_TTL, search_context)
+            _cache.move_to_end(key)
+            while len(_cache) > SEARCH_CONTEXT_MAX_ENTRIES:
+                _cache.popitem(last=False)
+        return search_context
+    finally:
+        with _lock:
+            _pending.pop(key, None)
+
+
+def _cached(key):
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.time():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return entry[1]
+
+
+def prefetch(role, company):
+    """Start the search in the background unless it is cached or already running. Returns a Future or None."""
+    if not role or not company:
+        return None
+    key = _key(role, company)
+    with _lock:
+        if _cached(key) is not None:
+            return None
+        future = _pending.get(key)
+        if future is None:
+            future = _executor.submit(_search, key, role, company)
+            _pending[key] = future
+        return future
+
+
+def get_search_context(role, company, timeout=SEARCH_CONTEXT_TIMEOUT):
+    """
+    Search background for (role, company), waiting at most `timeout` seconds.
+
+    A search that times out keeps running and fills the cache for the next
+    request; this one falls back to general knowledge.
+    """
+    key = _key(role, company)
+    with _lock:
+        context = _cached(key)
+    if context is not None:
+        return context
+
+    future = prefetch(role, company)
+    if future is None:
+        with _lock:
+            return _cached(key) or FALLBACK_CONTEXT
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        instrumentation.log(f"❌ Web search for {role} at {company} timed out after {timeout}s; using general knowledge", level="error")
+    except Exception as e:
+        instrumentation.log(f"❌ Web search failed: {e}", level="error")
+    return FALLBACK_CONTEXT
@@ -1,9 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
 from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
 
+# PDFs that make up the report's knowledge base
+KNOWLEDGE_BASE_DIR = os.getenv(
+    "KNOWLEDGE_BASE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "KnowledgeBase"),
+)
+
+# Processes parsing PDFs in parallel; 1 parses in the calling process
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+
+def list_pdfs(path=KNOWLEDGE_BASE_DIR):
+    """Sorted paths of every PDF under the knowledge base directory."""
+    pdfs = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                pdfs.append(os.path.join(root, name))
+    return sorted(pdfs)
+
+
+def load_pdf(path):
+    """Load a single PDF as one Document per page (metadata: source, page)."""
+    return PyPDFLoader(path).load()
+
 
-def document_loader():
+def iter_pdfs(paths, workers=INGEST_WORKERS):
+    """
+    Parse PDFs in a process pool and yield (path, pages, error) as each finishes.
+
+    At most 2 * workers files are in flight, so memory stays bounded no matter
+    how many PDFs there are. Order follows completion, not the input order.
+    """
+    paths = iter(paths)
+    if workers <= 1:
+        for path in paths:
+            try:
+                yield path, load_pdf(path), None
+            except Exception as e:
+                yield path, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def fill():
+            while len(pending) < workers * 2:
+                path = next(paths, None)
+                if path is None:
+                    return
+                pending[pool.submit(load_pdf, path)] = path
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    yield path, future.result(), None
+                except Exception as e:
+                    yield path, None, e
+            fill()
+
+
+def document_loader(path=KNOWLEDGE_BASE_DIR):
     loader = DirectoryLoader(
-        path='ReportGeneration\KnowledgeBase',
+        path=path,
         glob='*.pdf',
         loader_cls=PyPDFLoader
     )
@@ -11,4 +76,3 @@ def document_loader():
     docs = loader.load()
 
     return docs
-
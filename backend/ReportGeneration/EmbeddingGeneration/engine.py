@@ -0,0 +1,190 @@
+# engine.py
+#
+# Batched, rate-limited, concurrent embedding of document chunks. Input is
+# split into API-sized batches that run on a thread pool under a QPS budget;
+# failed batches are retried with backoff, results keep the input order, and
+# embeddings are cached by a hash of the chunk text.
+
+import os
+import time
+import random
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
+
+EMBEDDING_MODEL = "models/embedding-001"
+
+# embed_content accepts at most 100 texts per request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+# Batch requests per second across all threads; 0 = unlimited
+EMBED_QPS = float(os.getenv("EMBED_QPS", "5"))
+EMBED_RETRIES = int(os.getenv("EMBED_RETRIES", "4"))
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE", "1"))
+EMBED_BACKOFF_MAX = float(os.getenv("EMBED_BACKOFF_MAX", "30"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+
+
+class EmbeddingError(Exception):
+    """A batch could not be embedded after all retries."""
+
+
+def gemini_embed(texts, model=EMBEDDING_MODEL, task_type="retrieval_document"):
+    """Embed a batch with Gemini; documents use retrieval_document to pair with retrieval_query."""
+    import google.generativeai as genai
+    result = genai.embed_content(model=model, content=texts, task_type=task_type)
+    return result["embedding"]
+
+
+# Live engines, reported on /metrics
+_engines = weakref.WeakSet()
+
+def _collect_engine_stats():
+    for engine in list(_engines):
+        labels = {"engine": engine.cache_key or "default"}
+        for name, value in engine.stats().items():
+            yield f"embedding_engine_{name}", labels, value
+
+instrumentation.register_collector(_collect_engine_stats)
+
+
+class RateLimiter:
+    """Spaces calls at least 1/qps seconds apart, shared by all threads."""
+
+    def __init__(self, qps):
+        self.interval = 1.0 / qps if qps > 0 else 0
+        self.next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class EmbeddingEngine:
+    """
+    Embeds lists of texts in API-sized batches.
+
+    embed_fn takes a list of strings and returns one vector per string, so a
+    local fake can stand in for Gemini.
+    """
+
+    def __init__(self, embed_fn=gemini_embed, batch_size=EMBED_BATCH_SIZE, concurrency=EMBED_CONCURRENCY,
+                 qps=EMBED_QPS, retries=EMBED_RETRIES, cache_entries=EMBED_CACHE_MAX_ENTRIES, cache_key=""):
+        self.embed_fn = embed_fn
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.retries = retries
+        self.limiter = RateLimiter(qps)
+        self.cache_entries = cache_entries
+        # Namespace for cache keys, e.g. the model name
+        self.cache_key = cache_key
+        self.cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self.metrics = {"texts": 0, "cache_hits": 0, "batches": 0, "retries": 0,
+                        "failures": 0, "embedded": 0, "seconds": 0.0}
+        _engines.add(self)
+
+    def _key(self, text):
+        return hashlib.sha256((self.cache_key + "\0" + text).encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key):
+        with self._lock:
+            vector = self.cache.get(key)
+            if vector is not None:
+                self.cache.move_to_end(key)
+            return vector
+
+    def _cache_set(self, key, vector):
+        if self.cache_entries <= 0:
+            return
+        with self._lock:
+            self.cache[key] = vector
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_entries:
+                self.cache.popitem(last=False)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.metrics[name] += value
+
+    def _embed_batch(self, texts):
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                self._count("batches")
+                with instrumentation.span("embedding", engine=self.cache_key or "default"):
+                    vectors = self.embed_fn(texts)
+                if len(vectors) != len(texts):
+                    raise EmbeddingError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                return [list(vector) for vector in vectors]
+            except Exception as e:
+                if attempt >= self.retries:
+                    self._count("failures")
+                    raise EmbeddingError(f"Embedding batch of {len(texts)} failed: {e}") from e
+                self._count("retries")
+                # Full jitter, as in http_client
+                time.sleep(random.uniform(0, min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt)))
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed")
+            return self._executor
+
+    def embed(self, texts):
+        """Return one embedding per text, in input order. Raises EmbeddingError on failure."""
+        started = time.perf_counter()
+        keys = [self._key(text) for text in texts]
+        results = [self._cache_get(key) for key in keys]
+        self._count("texts", len(texts))
+        self._count("cache_hits", sum(vector is not None for vector in results))
+
+        # Embed each distinct missing text once
+        missing = {}
+        for index, (key, vector) in enumerate(zip(keys, results)):
+            if vector is None:
+                missing.setdefault(key, []).append(index)
+        todo = [(key, texts[indexes[0]]) for key, indexes in missing.items()]
+        batches = [todo[start:start + self.batch_size] for start in range(0, len(todo), self.batch_size)]
+
+        if len(batches) == 1:
+            outputs = [self._embed_batch([text for _, text in batches[0]])]
+        elif batches:
+            outputs = self._get_executor().map(lambda batch: self._embed_batch([text for _, text in batch]), batches)
+        else:
+            outputs = []
+
+        for batch, vectors in zip(batches, outputs):
+            for (key, _), vector in zip(batch, vectors):
+                self._cache_set(key, vector)
+                for index in missing[key]:
+                    results[index] = vector
+
+        self._count("embedded", len(todo))
+        self._count("seconds", time.perf_counter() - started)
+        return results
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics)
+            stats["cache_entries"] = len(self.cache)
+        stats["texts_per_sec"] = stats["texts"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -1,8 +1,11 @@
 import google.generativeai as genai
 import os
+import hashlib
 from dotenv import load_dotenv
 import chromadb # Import chromadb
 
+from ReportGeneration.EmbeddingGeneration.engine import EmbeddingEngine, EMBEDDING_MODEL
+
 # Load environment variables
 load_dotenv()
 
@@ -13,27 +16,35 @@ if not api_key:
 # Configure the genai library with your API key
 genai.configure(api_key=api_key)
 
+# Shared engine: batches, rate-limits, retries and caches embedding calls
+engine = EmbeddingEngine(cache_key=EMBEDDING_MODEL)
+
 def embedding_generation(chunks):
     """
-    Generates embeddings for a list of text chunks.
+    Generates embeddings for a list of text chunks, in the same order.
+
+    Raises EmbeddingError if a batch still fails after retries.
     """
-    try:
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=chunks  # Pass the list of chunks directly
-        )
-        return result['embedding']  # This will be a list of embeddings
-    except Exception as e:
-        print(f"Error generating embeddings: {e}")
-        return None
+    embeddings = engine.embed(chunks)
+    stats = engine.stats()
+    print(f"Embedded {len(chunks)} chunks ({stats['texts_per_sec']:,.1f} chunks/sec overall, "
+          f"{stats['cache_hits']} cache hits, {stats['retries']} retries).")
+    return embeddings
+
+def get_collection(collection_name="my_document_embeddings", db_path="./chroma_db"):
+    client = chromadb.PersistentClient(path=db_path)
+    return client.get_or_create_collection(name=collection_name)
 
-def store_embeddings_in_chromadb(embeddings, chunks, collection_name="my_document_embeddings", db_path="./chroma_db"):
+def store_embeddings_in_chromadb(embeddings, chunks, ids=None, metadatas=None,
+                                 collection_name="my_document_embeddings", db_path="./chroma_db"):
     """
     Stores text chunks and their embeddings in a ChromaDB collection.
 
     Args:
         embeddings (list): A list of embedding vectors.
         chunks (list): A list of corresponding text chunks (strings).
+        ids (list): Stable chunk ids; defaults to a hash of each chunk's content.
+        metadatas (list): Optional metadata dict per chunk (e.g. source file).
         collection_name (str): The name of the ChromaDB collection.
         db_path (str): The path to store the ChromaDB data.
     """
@@ -45,24 +56,30 @@ def store_embeddings_in_chromadb(embeddings, chunks, collection_name="my_documen
         raise ValueError("Number of embeddings must match the number of chunks.")
 
     try:
-        # Initialize ChromaDB client
-        client = chromadb.PersistentClient(path=db_path)
-
-        # Get or create the collection
-        collection = client.get_or_create_collection(name=collection_name)
+        collection = get_collection(collection_name, db_path)
 
-        # Generate unique IDs for each chunk
-        # In a real application, you might use a more robust ID generation
-        ids = [f"chunk_{i}" for i in range(len(chunks))]
+        # Content-derived ids, so storing the same chunk twice overwrites it instead of duplicating it
+        if ids is None:
+            ids = [hashlib.sha256(chunk.encode("utf-8")).hexdigest() for chunk in chunks]
 
-        # Add data to the collection
-        collection.add(
+        # Upsert so a re-run replaces existing chunks
+        collection.upsert(
             embeddings=embeddings,
             documents=chunks,
+            metadatas=metadatas,
             ids=ids
         )
         print(f"Successfully stored {len(chunks)} chunks and embeddings in ChromaDB collection '{collection_name}'.")
         print(f"ChromaDB data stored at: {db_path}")
 
     except Exception as e:
-        print(f"Error storing embeddings in ChromaDB: {e}")
\ No newline at end of file
+        print(f"Error storing embeddings in ChromaDB: {e}")
+        raise
+
+def delete_chunks_from_chromadb(ids, collection_name="my_document_embeddings", db_path="./chroma_db"):
+    """Removes chunks by id, e.g. those of a deleted or changed PDF."""
+    if not ids:
+        return
+    collection = get_collection(collection_name, db_path)
+    collection.delete(ids=list(ids))
+    print(f"Removed {len(ids)} chunks from ChromaDB collection '{collection_name}'.")
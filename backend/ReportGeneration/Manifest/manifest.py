@@ -0,0 +1,72 @@
+import os
+import json
+import hashlib
+
+# Record of what is already in the vector store: per file, its content hash
+# and the ids/content hashes of the chunks it produced.
+DEFAULT_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", "ingestion_manifest.json")
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Hash a file in blocks so large PDFs are never read into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_ids(source: str, chunks: list[str]) -> list[tuple[str, str]]:
+    """
+    Deterministic (chunk_id, content_hash) pairs for one file's chunks.
+
+    The id is built from the source path and the chunk's own content, so an
+    unchanged chunk keeps its id when other parts of the file change. Repeated
+    identical chunks in one file get an occurrence suffix.
+    """
+    source_key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    seen = {}
+    pairs = []
+    for chunk in chunks:
+        digest = content_hash(chunk)
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        pairs.append((f"{source_key}-{digest[:20]}-{occurrence}", digest))
+    return pairs
+
+
+class IngestionManifest:
+    """JSON manifest of ingested files, saved atomically after every change."""
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.files = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.files = json.load(f).get("files", {})
+
+    def file_hash(self, source):
+        entry = self.files.get(source)
+        return entry["sha256"] if entry else None
+
+    def chunks(self, source):
+        entry = self.files.get(source)
+        return dict(entry["chunks"]) if entry else {}
+
+    def update(self, source, sha256, chunks):
+        self.files[source] = {"sha256": sha256, "chunks": chunks}
+        self.save()
+
+    def remove(self, source):
+        self.files.pop(source, None)
+        self.save()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,220 @@
+# prompt_builder.py
+#
+# Assembles the report prompt from a session record under a token budget.
+# Each section is serialised compactly (scores instead of full analyses,
+# emotion histograms and a coarse timeline instead of per-frame data), and
+# when the total is over budget the lowest-priority sections are cut first.
+
+import os
+import math
+from collections import Counter
+
+from AudioAnalyser.services.fluency import fluency_summary
+
+# Estimated prompt tokens for the report; latency and cost stay flat beyond this
+REPORT_PROMPT_TOKEN_BUDGET = int(os.getenv("REPORT_PROMPT_TOKEN_BUDGET", "6000"))
+# Longest transcript excerpt kept per answer, in characters
+REPORT_MAX_ANSWER_CHARS = int(os.getenv("REPORT_MAX_ANSWER_CHARS", "1500"))
+REPORT_MAX_FIELD_CHARS = int(os.getenv("REPORT_MAX_FIELD_CHARS", "600"))
+# Segments the emotion timeline is reduced to
+REPORT_TIMELINE_SEGMENTS = int(os.getenv("REPORT_TIMELINE_SEGMENTS", "10"))
+
+# Roughly four characters per token for English text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _shorten(text, limit):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class Section:
+    """A titled list of items; truncation drops items from the end, down to min_items."""
+
+    def __init__(self, name, title, items, priority, min_items=1):
+        self.name = name
+        self.title = title
+        self.items = [item for item in items if item]
+        self.priority = priority  # lower is more important
+        self.min_items = min_items
+        self.dropped = 0
+
+    def render(self):
+        if not self.items:
+            return ""
+        body = "\n".join(self.items)
+        if self.dropped:
+            body += f"\n({self.dropped} more omitted for length)"
+        return f"=== {self.title} ===\n{body}"
+
+    def tokens(self):
+        return estimate_tokens(self.render())
+
+
+# --- Section formatters ---
+
+def job_info_items(job_info):
+    labels = {"candidate_name": "Candidate", "job_role": "Role", "company_name": "Company",
+              "job_description": "Job description", "other_details": "Other details"}
+    return [f"{label}: {_shorten(job_info[key], REPORT_MAX_FIELD_CHARS)}"
+            for key, label in labels.items() if job_info.get(key)]
+
+
+def question_items(questions):
+    items = [f"{i}. {_shorten(question, 300)}" for i, question in enumerate(questions.get("questions") or [], 1)]
+    if questions.get("summary"):
+        items.append(f"Role focus: {_shorten(questions['summary'], REPORT_MAX_FIELD_CHARS)}")
+    return items
+
+
+def _answers(audio_transcripts):
+    # Entries are keyed by ISO timestamp, so sorting by key is chronological
+    return [audio_transcripts[timestamp] for timestamp in sorted(audio_transcripts)]
+
+
+def score_items(audio_transcripts):
+    """One line of category scores per answer, plus the average per category."""
+    items = []
+    totals, counts = Counter(), Counter()
+    for i, answer in enumerate(_answers(audio_transcripts), 1):
+        analysis = answer.get("analysis") or {}
+        evaluation = analysis.get("evaluation") or []
+        if not evaluation:
+            items.append(f"Answer {i}: no evaluation ({analysis.get('error', 'unavailable')})")
+            continue
+        scores = []
+        for entry in evaluation:
+            totals[entry["category"]] += entry["score"]
+            counts[entry["category"]] += 1
+            scores.append(f"{entry['category']} {entry['score']:g}")
+        line = f"Answer {i}: " + ", ".join(scores)
+        if analysis.get("overall_summary"):
+            line += f" | {_shorten(analysis['overall_summary'], 200)}"
+        items.append(line)
+    if counts:
+        averages = ", ".join(f"{category} {totals[category] / counts[category]:.1f}" for category in counts)
+        items.insert(0, f"Average: {averages}")
+    return items
+
+
+def fluency_items(audio_transcripts):
+    """The measured delivery numbers per answer, plus speaking rate and fillers over the whole interview."""
+    items = []
+    words = minutes = fillers = 0
+    for i, answer in enumerate(_answers(audio_transcripts), 1):
+        metrics = answer.get("fluency") or {}
+        summary = fluency_summary(metrics)
+        if not summary:
+            continue
+        items.append(f"Answer {i}: {summary}")
+        words += metrics["word_count"]
+        minutes += metrics["duration_seconds"] / 60
+        fillers += metrics["filler_count"]
+    if words and minutes:
+        items.insert(0, f"Overall: {words / minutes:.0f} wpm, {fillers / words * 100:.1f} fillers/100 words")
+    return items
+
+
+def transcript_items(audio_transcripts):
+    return [f"Answer {i}: {_shorten(answer.get('transcription') or '', REPORT_MAX_ANSWER_CHARS)}"
+            for i, answer in enumerate(_answers(audio_transcripts), 1)]
+
+
+def _timeline_segments(timeline, segments):
+    if not timeline:
+        return []
+    start, end = timeline[0]["t"], timeline[-1]["t"]
+    width = max((end - start) / segments, 1e-9)
+    buckets = [Counter() for _ in range(segments)]
+    for point in timeline:
+        buckets[min(int((point["t"] - start) / width), segments - 1)][point["emotion"]] += 1
+    return [
+        f"{start + i * width:.0f}-{start + (i + 1) * width:.0f}s {bucket.most_common(1)[0][0]}"
+        for i, bucket in enumerate(buckets) if bucket
+    ]
+
+
+def video_items(video_analysis):
+    """Emotion shares, average confidences and a coarse timeline from the session's emotion summary."""
+    histogram = video_analysis.get("emotion_histogram") or {}
+    if not histogram:
+        return []
+    total = sum(histogram.values())
+    confidence = video_analysis.get("average_confidence") or {}
+    shares = ", ".join(
+        f"{emotion} {count / total:.0%} (conf {confidence.get(emotion, 0):.2f})"
+        for emotion, count in sorted(histogram.items(), key=lambda item: -item[1])
+    )
+    items = [
+        f"Frames with a face: {video_analysis.get('frames_with_face', total)}/{video_analysis.get('frames_received', total)}"
+        f" over {video_analysis.get('duration_seconds', 0):.0f}s",
+        f"Dominant: {video_analysis.get('dominant_emotion')}",
+        f"Share: {shares}",
+    ]
+    segments = _timeline_segments(video_analysis.get("timeline") or [], REPORT_TIMELINE_SEGMENTS)
+    if segments:
+        items.append("Timeline: " + "; ".join(segments))
+    return items
+
+
+def context_items(context_chunks):
+    return [f"[{chunk.get('source')} p.{chunk.get('page')}] {_shorten(chunk['text'], 2048)}" for chunk in context_chunks]
+
+
+# --- Assembly ---
+
+def build_report_prompt(session, context_chunks, budget=REPORT_PROMPT_TOKEN_BUDGET):
+    """
+    Return (prompt, stats) for one session record.
+
+    stats holds the estimated tokens per section, the total, the budget and
+    which sections were cut to fit it.
+    """
+    audio_transcripts = session.get("audio_transcripts") or {}
+    # Listed in prompt order; priority decides what is cut first (highest number first)
+    sections = [
+        Section("context", "Retrieved Context", context_items(context_chunks), priority=5),
+        Section("job_info", "Job Info", job_info_items(session.get("job_info") or {}), priority=0),
+        Section("questions", "Questions Asked", question_items(session.get("questions") or {}), priority=3),
+        Section("scores", "Answer Scores", score_items(audio_transcripts), priority=1),
+        Section("fluency", "Speech Delivery (measured)", fluency_items(audio_transcripts), priority=2),
+        Section("transcripts", "Audio Transcript", transcript_items(audio_transcripts), priority=4),
+        Section("video", "Video Emotion Analysis", video_items(session.get("video_analysis") or {}), priority=2),
+    ]
+
+    def total():
+        return sum(section.tokens() for section in sections)
+
+    truncated = []
+    # Drop items from the least important sections first
+    for section in sorted(sections, key=lambda section: -section.priority):
+        while total() > budget and len(section.items) > section.min_items:
+            section.items.pop()
+            section.dropped += 1
+        if section.dropped:
+            truncated.append(section.name)
+
+    # Still over: shorten the last item of each section, least important first
+    for section in sorted(sections, key=lambda section: -section.priority):
+        excess = total() - budget
+        if excess <= 0:
+            break
+        if section.items and section.priority > 0:
+            last = section.items[-1]
+            keep = max(len(last) - excess * CHARS_PER_TOKEN, 80)
+            section.items[-1] = _shorten(last, keep)
+            if section.name not in truncated:
+                truncated.append(section.name)
+
+    prompt = "\n\n".join(section.render() for section in sections if section.items)
+    stats = {
+        "sections": {section.name: section.tokens() for section in sections},
+        "total_tokens": estimate_tokens(prompt),
+        "budget": budget,
+        "truncated": truncated,
+    }
+    return prompt, stats
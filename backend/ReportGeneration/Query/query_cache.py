@@ -0,0 +1,114 @@
+# query_cache.py
+
+import os
+import json
+import time
+import threading
+import instrumentation
+
+from ReportGeneration.Query.query_generation import QueryGenerator
+from ReportGeneration.Retriever.retriever import ContextRetriever
+
+# The report always starts from the same short prompt, so its expansion and
+# embedding are computed once, persisted, and reused by every report.
+DEFAULT_QUERY_PROMPT = "Give me the best interview tips, tricks, feedbacks"
+ROLE_QUERY_PROMPT = "Give me the best interview tips, tricks, feedbacks for a {role} interview"
+
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "query_cache.json")
+# Seconds before a precomputed query is recomputed
+QUERY_CACHE_REFRESH = float(os.getenv("QUERY_CACHE_REFRESH", "604800"))
+# Also keep a role-specific query per job role
+QUERY_CACHE_PER_ROLE = os.getenv("QUERY_CACHE_PER_ROLE", "false").lower() == "true"
+
+DEFAULT_KEY = "__default__"
+
+_entries = {}   # key -> {"prompt", "query", "embedding", "created_at"}
+_lock = threading.Lock()
+_loaded = False
+
+
+def _role_key(role):
+    return "role:" + " ".join(role.lower().split()) if role and role.strip() else DEFAULT_KEY
+
+
+def _load():
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    try:
+        with open(QUERY_CACHE_PATH, "r", encoding="utf-8") as f:
+            _entries.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        instrumentation.log(f"❌ Could not read query cache {QUERY_CACHE_PATH}: {e}", level="error")
+
+
+def _save():
+    tmp_path = QUERY_CACHE_PATH + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_entries, f)
+        os.replace(tmp_path, QUERY_CACHE_PATH)
+    except Exception as e:
+        instrumentation.log(f"❌ Could not write query cache {QUERY_CACHE_PATH}: {e}", level="error")
+
+
+def _compute(prompt):
+    expanded_query = QueryGenerator().generate(prompt) or prompt
+    embedding = ContextRetriever().embed_query(expanded_query)
+    return {"prompt": prompt, "query": expanded_query, "embedding": embedding, "created_at": time.time()}
+
+
+def _is_fresh(entry):
+    return entry is not None and entry.get("embedding") and time.time() - entry["created_at"] < QUERY_CACHE_REFRESH
+
+
+def get_report_query(role=None):
+    """
+    Return (expanded_query, query_embedding) for the report's retrieval step.
+
+    Uses the role-specific query when QUERY_CACHE_PER_ROLE is on, otherwise the
+    shared default. Entries are computed on a miss and persisted to disk.
+    """
+    key = _role_key(role) if QUERY_CACHE_PER_ROLE else DEFAULT_KEY
+    with _lock:
+        _load()
+        entry = _entries.get(key)
+        if _is_fresh(entry):
+            return entry["query"], entry["embedding"]
+
+    prompt = ROLE_QUERY_PROMPT.format(role=role.strip()) if key != DEFAULT_KEY else DEFAULT_QUERY_PROMPT
+    entry = _compute(prompt)
+    if not entry["embedding"]:
+        # Don't persist a failed embedding; the retriever will embed the query itself
+        return entry["query"], None
+
+    with _lock:
+        _entries[key] = entry
+        _save()
+    return entry["query"], entry["embedding"]
+
+
+def warm(roles=()):
+    """Precompute the default query (and any given roles); call at startup or on a schedule."""
+    get_report_query()
+    if QUERY_CACHE_PER_ROLE:
+        for role in roles:
+            get_report_query(role)
+
+
+def refresh_stale():
+    """Recompute every persisted entry that is older than QUERY_CACHE_REFRESH."""
+    with _lock:
+        _load()
+        stale = [key for key, entry in _entries.items() if not _is_fresh(entry)]
+        prompts = {key: _entries[key]["prompt"] for key in stale}
+
+    for key, prompt in prompts.items():
+        entry = _compute(prompt)
+        if entry["embedding"]:
+            with _lock:
+                _entries[key] = entry
+                _save()
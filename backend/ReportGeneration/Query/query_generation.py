@@ -3,6 +3,8 @@
 import os
 import google.generativeai as genai
 from dotenv import load_dotenv
+from llm_cache import generate_text
+import instrumentation
 
 # Load environment variables
 load_dotenv()
@@ -11,10 +13,10 @@ load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 class QueryGenerator:
-    def __init__(self):
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
+    def __init__(self, model_name: str = "gemini-2.5-flash"):
+        self.model_name = model_name
 
-    def generate(self, short_prompt: str) -> str:
+    def generate(self, short_prompt: str, use_cache: bool = True) -> str:
         prompt = f"""
 You are assisting in an AI-powered interview analysis system.
 
@@ -39,8 +41,8 @@ Give only the expanded query without extra commentary.
 """
 
         try:
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            response_text = generate_text(self.model_name, prompt, use_cache=use_cache)
+            return response_text.strip()
         except Exception as e:
-            print(f"❌ Error generating query: {e}")
+            instrumentation.log(f"❌ Error generating query: {e}", level="error")
             return ""
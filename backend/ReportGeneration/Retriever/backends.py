@@ -0,0 +1,62 @@
+# backends.py
+
+import os
+import asyncio
+
+from ReportGeneration.Retriever import pgvector_store
+from ReportGeneration.Retriever.local_store import LocalVectorStore
+import instrumentation
+
+# "pgvector" (Neon) or "local" (memory-mapped NumPy index built from Chroma)
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "pgvector")
+
+
+class RetrieverBackend:
+    """Vector search over the knowledge base; returns chunk dicts (text, source, page, chunk_id)."""
+
+    name = "base"
+
+    def search(self, query_vector, top_k=5, filters=None):
+        raise NotImplementedError
+
+    async def search_async(self, query_vector, top_k=5, filters=None):
+        return await asyncio.to_thread(self.search, query_vector, top_k, filters)
+
+
+class PgVectorBackend(RetrieverBackend):
+    name = "pgvector"
+
+    def search(self, query_vector, top_k=5, filters=None):
+        if filters:
+            raise ValueError("❌ The pgvector backend does not support metadata filters.")
+        return pgvector_store.search(query_vector, top_k)
+
+    async def search_async(self, query_vector, top_k=5, filters=None):
+        if filters:
+            raise ValueError("❌ The pgvector backend does not support metadata filters.")
+        return await pgvector_store.search_async(query_vector, top_k)
+
+
+class LocalBackend(RetrieverBackend):
+    name = "local"
+
+    def __init__(self, store=None):
+        self.store = store or LocalVectorStore()
+
+    def search(self, query_vector, top_k=5, filters=None):
+        with instrumentation.span("local_vector_query"):
+            return self.store.search(query_vector, top_k, filters)
+
+
+BACKENDS = {"pgvector": PgVectorBackend, "local": LocalBackend}
+
+_backend = None
+
+def get_backend():
+    """Process-wide backend selected by RETRIEVER_BACKEND."""
+    global _backend
+    if _backend is None:
+        if RETRIEVER_BACKEND not in BACKENDS:
+            raise ValueError(f"❌ Unknown RETRIEVER_BACKEND '{RETRIEVER_BACKEND}'. Use {', '.join(BACKENDS)}.")
+        _backend = BACKENDS[RETRIEVER_BACKEND]()
+    return _backend
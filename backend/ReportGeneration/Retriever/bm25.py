@@ -0,0 +1,114 @@
+# bm25.py
+#
+# Keyword index over chunk text, built next to the local vector index at
+# ingestion time. Postings are stored as flat NumPy arrays (CSR layout: one
+# slice of doc ids and term frequencies per term) in a single .npz file.
+
+import os
+import re
+import json
+import threading
+from collections import Counter
+
+import numpy as np
+
+BM25_FILE = "bm25.npz"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Keeps terms like "c++", "c#" and "node.js" intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*[+#]*")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have i if in into is it its of on or so such
+that the their then there these they this to was were will with you your we our can
+""".split())
+
+
+def tokenize(text):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Builder:
+    """Accumulates postings document by document; save() writes the compact arrays."""
+
+    def __init__(self):
+        self.postings = {}   # term -> ([doc ids], [term frequencies])
+        self.doc_lengths = []
+
+    def add(self, text):
+        doc_id = len(self.doc_lengths)
+        tokens = tokenize(text)
+        self.doc_lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            doc_ids, tfs = self.postings.setdefault(term, ([], []))
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+
+    def save(self, path):
+        terms = sorted(self.postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            indptr[i + 1] = indptr[i] + len(self.postings[term][0])
+        doc_ids = np.fromiter((d for term in terms for d in self.postings[term][0]), dtype=np.int32, count=indptr[-1])
+        tfs = np.fromiter((tf for term in terms for tf in self.postings[term][1]), dtype=np.uint16, count=indptr[-1])
+        # np.savez appends .npz to names without it, so write through a file object
+        with open(path, "wb") as f:
+            np.savez(f, terms=np.array(terms, dtype=str), indptr=indptr, doc_ids=doc_ids, tfs=tfs,
+                     doc_lengths=np.asarray(self.doc_lengths, dtype=np.int32))
+
+
+class BM25Index:
+    """Okapi BM25 over the chunks in metadata.json; reloads itself when the index is rebuilt."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, BM25_FILE)
+        self.chunks = []
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with np.load(self.path) as data:
+                terms = data["terms"]
+                self.vocab = {term: i for i, term in enumerate(terms.tolist())}
+                self.indptr = data["indptr"]
+                self.doc_ids = data["doc_ids"]
+                self.tfs = data["tfs"].astype(np.float32)
+                doc_lengths = data["doc_lengths"].astype(np.float32)
+            with open(os.path.join(self.index_dir, "metadata.json"), "r", encoding="utf-8") as f:
+                self.chunks = json.load(f)
+            n = len(doc_lengths)
+            df = np.diff(self.indptr).astype(np.float32)
+            self.idf = np.log1p((n - df + 0.5) / (df + 0.5))
+            avg_length = doc_lengths.mean() if n else 1.0
+            # Per-document part of the BM25 denominator, computed once
+            self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / max(avg_length, 1.0))
+            self._mtime = mtime
+
+    def search(self, query, top_k=5):
+        """Top-k chunks by BM25 score; chunks without any query term are not returned."""
+        self._load()
+        term_ids = [self.vocab[term] for term in set(tokenize(query)) if term in self.vocab]
+        if not term_ids or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs, tf = self.doc_ids[start:end], self.tfs[start:end]
+            scores[docs] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + self.length_norm[docs])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [{"id": int(i), "score": float(scores[i]), **self.chunks[i]} for i in hits]
@@ -0,0 +1,93 @@
+# hybrid.py
+#
+# Combines vector and BM25 hits: reciprocal rank fusion, removal of the text
+# that neighbouring chunks share through the splitter's chunk_overlap, and an
+# optional MMR pass for diversity.
+
+import os
+
+from ReportGeneration.Retriever.bm25 import tokenize
+
+RRF_K = int(os.getenv("RETRIEVER_RRF_K", "60"))
+MMR_LAMBDA = float(os.getenv("RETRIEVER_MMR_LAMBDA", "0.7"))
+# Shortest shared prefix/suffix treated as splitter overlap rather than coincidence
+MIN_OVERLAP_CHARS = int(os.getenv("RETRIEVER_MIN_OVERLAP_CHARS", "50"))
+
+
+def _key(hit):
+    return hit.get("chunk_id") or hit["text"]
+
+
+def rrf_fuse(*rankings, k=RRF_K):
+    """Merge ranked hit lists; each hit scores sum(1 / (k + rank)) over the lists it appears in."""
+    fused = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            key = _key(hit)
+            entry = fused.setdefault(key, {**hit, "rrf_score": 0.0})
+            entry["rrf_score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda hit: hit["rrf_score"], reverse=True)
+
+
+def _overlap(head, tail):
+    """Length of the longest suffix of head that is also a prefix of tail."""
+    probe = tail[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = head.find(probe)
+    while start != -1:
+        if tail.startswith(head[start:]):
+            return len(head) - start
+        start = head.find(probe, start + 1)
+    return 0
+
+
+def dedupe_overlaps(hits):
+    """
+    Drop duplicate and contained chunks, and cut the text a hit shares with a
+    higher-ranked hit from the same source, so the prompt doesn't repeat it.
+    """
+    kept = []
+    for hit in hits:
+        text = hit["text"]
+        for other in kept:
+            if other.get("source") != hit.get("source"):
+                continue
+            if text in other["text"]:
+                text = ""
+                break
+            cut = _overlap(other["text"], text)
+            if cut:
+                text = text[cut:]
+            cut = _overlap(text, other["text"])
+            if cut:
+                text = text[:-cut]
+        if text.strip():
+            kept.append({**hit, "text": text})
+    return kept
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def mmr(hits, top_k, lambda_=MMR_LAMBDA):
+    """
+    Maximal marginal relevance over fused hits, using token overlap as similarity.
+
+    Hits without an rrf_score (a single unfused list) are scored by rank.
+    """
+    if len(hits) <= top_k:
+        return hits
+    scores = [hit.get("rrf_score", 1.0 / (RRF_K + rank)) for rank, hit in enumerate(hits, start=1)]
+    best = max(scores) or 1.0
+    tokens = [set(tokenize(hit["text"])) for hit in hits]
+    selected, remaining = [], list(range(len(hits)))
+    while remaining and len(selected) < top_k:
+        def gain(i):
+            redundancy = max((_jaccard(tokens[i], tokens[j]) for j in selected), default=0.0)
+            return lambda_ * scores[i] / best - (1 - lambda_) * redundancy
+        choice = max(remaining, key=gain)
+        selected.append(choice)
+        remaining.remove(choice)
+    return [hits[i] for i in selected]
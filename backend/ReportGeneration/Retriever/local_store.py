@@ -0,0 +1,157 @@
+# local_store.py
+#
+# In-process vector index for small and medium knowledge bases. Embeddings are
+# kept as a memory-mapped float32 .npy file with L2-normalised rows, so every
+# worker shares the same page cache and top-k is one matmul + argpartition.
+# The BM25 keyword index over the same chunks is written alongside.
+
+import os
+import json
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ReportGeneration.Retriever.bm25 import BM25Builder, BM25_FILE
+
+load_dotenv()
+
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "local_index")
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+
+
+def _normalise(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class LocalVectorStore:
+    """Read side of the local index; reloads itself when the files are rebuilt."""
+
+    def __init__(self, index_dir=LOCAL_INDEX_DIR):
+        self.index_dir = index_dir
+        self.matrix = None
+        self.chunks = []
+        self._columns = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        path = os.path.join(self.index_dir, EMBEDDINGS_FILE)
+        mtime = os.stat(path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            with open(os.path.join(self.index_dir, METADATA_FILE), "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            # Read-only mmap: the OS shares the pages between processes
+            matrix = np.load(path, mmap_mode="r")
+            if matrix.shape[0] != len(chunks):
+                raise ValueError(f"❌ Local index is inconsistent: {matrix.shape[0]} vectors, {len(chunks)} chunks")
+            self.matrix, self.chunks, self._columns, self._mtime = matrix, chunks, {}, mtime
+
+    def _column(self, field):
+        column = self._columns.get(field)
+        if column is None:
+            column = np.array([chunk.get(field) for chunk in self.chunks], dtype=object)
+            self._columns[field] = column
+        return column
+
+    def _filter_mask(self, filters):
+        """Rows matching every filter; a filter value may be a single value or a list of values."""
+        mask = np.ones(len(self.chunks), dtype=bool)
+        for field, value in filters.items():
+            column = self._column(field)
+            if isinstance(value, (list, tuple, set)):
+                mask &= np.isin(column, list(value))
+            else:
+                mask &= column == value
+        return mask
+
+    def search(self, query_vector, top_k=5, filters=None):
+        """Top-k chunks by cosine similarity, optionally restricted by metadata filters."""
+        self._load()
+        matrix, chunks = self.matrix, self.chunks
+        if not chunks or top_k <= 0:
+            return []
+
+        query = _normalise(np.asarray(query_vector, dtype=np.float32))
+        scores = matrix @ query
+        if filters:
+            scores = np.where(self._filter_mask(filters), scores, -np.inf)
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": int(i), "score": float(scores[i]), **chunks[i]}
+            for i in top if np.isfinite(scores[i])
+        ]
+
+
+def write_index(rows, dim, count, index_dir=LOCAL_INDEX_DIR):
+    """
+    Write (chunk_id, text, embedding, metadata) rows to the index directory.
+
+    Embeddings are streamed into the memory-mapped file, and both files are
+    swapped in atomically so running readers never see a half-written index.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    embeddings_tmp = os.path.join(index_dir, EMBEDDINGS_FILE + ".tmp")
+    metadata_tmp = os.path.join(index_dir, METADATA_FILE + ".tmp")
+    bm25_tmp = os.path.join(index_dir, BM25_FILE + ".tmp")
+
+    matrix = np.lib.format.open_memmap(embeddings_tmp, mode="w+", dtype=np.float32, shape=(count, dim))
+    chunks = []
+    keywords = BM25Builder()
+    for i, (chunk_id, text, embedding, metadata) in enumerate(rows):
+        matrix[i] = _normalise(np.asarray(embedding, dtype=np.float32))
+        keywords.add(text)
+        metadata = metadata or {}
+        chunks.append({"chunk_id": chunk_id, "text": text,
+                       "source": metadata.get("source", "unknown"), "page": metadata.get("page")})
+    if len(chunks) != count:
+        raise ValueError(f"❌ Expected {count} rows, got {len(chunks)}")
+    matrix.flush()
+    del matrix
+
+    keywords.save(bm25_tmp)
+    with open(metadata_tmp, "w", encoding="utf-8") as f:
+        json.dump(chunks, f)
+    os.replace(metadata_tmp, os.path.join(index_dir, METADATA_FILE))
+    os.replace(bm25_tmp, os.path.join(index_dir, BM25_FILE))
+    # Readers key off the embeddings file, so it is replaced last
+    os.replace(embeddings_tmp, os.path.join(index_dir, EMBEDDINGS_FILE))
+    return count
+
+
+def build_from_chroma(collection_name="my_document_embeddings", db_path="./chroma_db",
+                      index_dir=LOCAL_INDEX_DIR, page_size=1000):
+    """Export the Chroma collection into the local index."""
+    import chromadb
+    collection = chromadb.PersistentClient(path=db_path).get_or_create_collection(collection_name)
+    count = collection.count()
+    if count == 0:
+        print("No chunks in ChromaDB; local index not built.")
+        return 0
+
+    first = collection.get(include=["embeddings"], limit=1)
+    dim = len(first["embeddings"][0])
+
+    def rows():
+        for offset in range(0, count, page_size):
+            page = collection.get(include=["documents", "embeddings", "metadatas"], limit=page_size, offset=offset)
+            yield from zip(page["ids"], page["documents"], page["embeddings"], page["metadatas"])
+
+    write_index(rows(), dim, count, index_dir)
+    print(f"✅ Local index built: {count} chunks x {dim} dims in {index_dir}")
+    return count
+
+
+# Entry point: python -m ReportGeneration.Retriever.local_store
+if __name__ == "__main__":
+    build_from_chroma()
@@ -0,0 +1,228 @@
+# pgvector_store.py
+
+import os
+import struct
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import psycopg2
+import psycopg2.pool
+from dotenv import load_dotenv
+
+import instrumentation
+
+load_dotenv()
+
+TABLE_NAME = "pdf_embeddings"
+
+# models/embedding-001 returns 768-dimensional vectors
+PG_VECTOR_DIM = int(os.getenv("PG_VECTOR_DIM", "768"))
+
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "10"))
+
+# Approximate index: "hnsw", "ivfflat" or "none" (exact scan)
+PG_INDEX_TYPE = os.getenv("PG_INDEX_TYPE", "hnsw")
+PG_HNSW_M = int(os.getenv("PG_HNSW_M", "16"))
+PG_HNSW_EF_CONSTRUCTION = int(os.getenv("PG_HNSW_EF_CONSTRUCTION", "64"))
+PG_HNSW_EF_SEARCH = int(os.getenv("PG_HNSW_EF_SEARCH", "40"))
+PG_IVFFLAT_LISTS = int(os.getenv("PG_IVFFLAT_LISTS", "0"))  # 0 = rows / 1000
+PG_IVFFLAT_PROBES = int(os.getenv("PG_IVFFLAT_PROBES", "10"))
+
+SEARCH_SQL = f"""
+    SELECT id, text, source, page, chunk_id
+    FROM {TABLE_NAME}
+    ORDER BY embedding <-> {{param}}
+    LIMIT {{limit}};
+"""
+
+
+def db_params():
+    return {
+        "dbname": os.getenv("PG_DB"),
+        "user": os.getenv("PG_USER"),
+        "password": os.getenv("PG_PASSWORD"),
+        "host": os.getenv("PG_HOST"),
+        "port": os.getenv("PG_PORT")
+    }
+
+
+def _row_to_dict(row):
+    return {"id": row[0], "text": row[1], "source": row[2], "page": row[3], "chunk_id": row[4]}
+
+
+# --- Sync pool (psycopg2) ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process-wide connection pool, so each query reuses an open TLS connection."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = psycopg2.pool.ThreadedConnectionPool(PG_POOL_MIN, PG_POOL_MAX, **db_params())
+    return _pool
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; commits on success, rolls back on error."""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+def close_pool():
+    global _pool
+    if _pool is not None:
+        _pool.closeall()
+        _pool = None
+
+
+def vector_literal(vector):
+    """Compact pgvector text literal; psycopg2 has no binary parameter format."""
+    values = np.asarray(vector, dtype=np.float32)
+    return "[" + ",".join(np.char.mod("%.7g", values)) + "]"
+
+
+def _set_search_params(cursor):
+    # SET LOCAL only lasts for the current transaction, so pooled connections stay clean
+    if PG_INDEX_TYPE == "hnsw":
+        cursor.execute("SET LOCAL hnsw.ef_search = %s", (PG_HNSW_EF_SEARCH,))
+    elif PG_INDEX_TYPE == "ivfflat":
+        cursor.execute("SET LOCAL ivfflat.probes = %s", (PG_IVFFLAT_PROBES,))
+
+
+def search(query_vector, top_k=5):
+    """Nearest chunks by L2 distance, using the ANN index when one exists."""
+    with instrumentation.span("pgvector_query"), connection() as conn:
+        with conn.cursor() as cursor:
+            _set_search_params(cursor)
+            cursor.execute(
+                SEARCH_SQL.format(param=f"%s::vector({PG_VECTOR_DIM})", limit="%s"),
+                (vector_literal(query_vector), top_k),
+            )
+            return [_row_to_dict(row) for row in cursor.fetchall()]
+
+
+# --- Schema and index management ---
+
+def ensure_schema(conn, dim=PG_VECTOR_DIM):
+    """Create the table with a typed vector(dim) column, upgrading an untyped one in place."""
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+                id SERIAL PRIMARY KEY,
+                chunk_id TEXT,
+                text TEXT NOT NULL,
+                embedding VECTOR({dim}),
+                source TEXT,
+                page INT
+            );
+        """)
+        cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN IF NOT EXISTS chunk_id TEXT;")
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {TABLE_NAME}_chunk_id_key ON {TABLE_NAME} (chunk_id);")
+
+        # Indexes need a fixed dimension; tables created by older versions used a bare VECTOR
+        cursor.execute("""
+            SELECT atttypmod FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attname = 'embedding';
+        """, (TABLE_NAME,))
+        if cursor.fetchone()[0] == -1:
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} ALTER COLUMN embedding TYPE vector({dim});")
+    conn.commit()
+
+
+def ensure_index(conn, index_type=PG_INDEX_TYPE):
+    """Build the ANN index on the embedding column if it does not exist yet."""
+    if index_type == "none":
+        return
+    with conn.cursor() as cursor:
+        if index_type == "hnsw":
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS {TABLE_NAME}_embedding_hnsw_idx
+                ON {TABLE_NAME} USING hnsw (embedding vector_l2_ops)
+                WITH (m = %s, ef_construction = %s);
+            """, (PG_HNSW_M, PG_HNSW_EF_CONSTRUCTION))
+        elif index_type == "ivfflat":
+            # IVFFlat clusters existing rows, so build it after the data is loaded
+            cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME};")
+            lists = PG_IVFFLAT_LISTS or max(cursor.fetchone()[0] // 1000, 10)
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS {TABLE_NAME}_embedding_ivfflat_idx
+                ON {TABLE_NAME} USING ivfflat (embedding vector_l2_ops)
+                WITH (lists = %s);
+            """, (lists,))
+        else:
+            raise ValueError(f"❌ Unknown PG_INDEX_TYPE '{index_type}'. Use hnsw, ivfflat or none.")
+        cursor.execute(f"ANALYZE {TABLE_NAME};")
+    conn.commit()
+
+
+# --- Async pool (asyncpg, binary vector codec) ---
+
+_async_pool = None
+
+def _encode_vector(vector):
+    # pgvector binary format: uint16 dim, uint16 unused, then big-endian float4 values
+    values = np.asarray(vector, dtype=">f4")
+    return struct.pack(">HH", values.shape[0], 0) + values.tobytes()
+
+def _decode_vector(data):
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).astype(np.float32)
+
+async def _init_async_connection(conn):
+    await conn.set_type_codec(
+        "vector", schema="public", encoder=_encode_vector, decoder=_decode_vector, format="binary"
+    )
+
+async def get_async_pool():
+    global _async_pool
+    if _async_pool is None:
+        import asyncpg
+        params = db_params()
+        _async_pool = await asyncpg.create_pool(
+            database=params["dbname"], user=params["user"], password=params["password"],
+            host=params["host"], port=params["port"],
+            min_size=PG_POOL_MIN, max_size=PG_POOL_MAX, init=_init_async_connection,
+        )
+    return _async_pool
+
+async def close_async_pool():
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+
+async def search_async(query_vector, top_k=5):
+    """Async nearest-chunk search; the query vector is sent in pgvector's binary format."""
+    pool = await get_async_pool()
+    with instrumentation.span("pgvector_query"):
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                if PG_INDEX_TYPE == "hnsw":
+                    await conn.execute(f"SET LOCAL hnsw.ef_search = {int(PG_HNSW_EF_SEARCH)}")
+                elif PG_INDEX_TYPE == "ivfflat":
+                    await conn.execute(f"SET LOCAL ivfflat.probes = {int(PG_IVFFLAT_PROBES)}")
+                rows = await conn.fetch(SEARCH_SQL.format(param="$1", limit="$2"), query_vector, top_k)
+    return [_row_to_dict(tuple(row)) for row in rows]
+
+
+# Entry point: python -m ReportGeneration.Retriever.pgvector_store
+if __name__ == "__main__":
+    with connection() as conn:
+        ensure_schema(conn)
+        ensure_index(conn)
+    print(f"✅ {TABLE_NAME} has a vector({PG_VECTOR_DIM}) column and a {PG_INDEX_TYPE} index")
@@ -1,79 +1,109 @@
 # retriever.py
 
 import os
-import numpy as np
-import psycopg2
+import asyncio
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+import instrumentation
+from ReportGeneration.Retriever.backends import get_backend
+from ReportGeneration.Retriever.bm25 import BM25Index
+from ReportGeneration.Retriever.local_store import LOCAL_INDEX_DIR
+from ReportGeneration.Retriever.hybrid import rrf_fuse, dedupe_overlaps, mmr
+
 # Load environment variables
 load_dotenv()
 
 # Configure Gemini API
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+# Fuse vector hits with BM25 keyword hits when the keyword index has been built
+RETRIEVER_HYBRID = os.getenv("RETRIEVER_HYBRID", "true").lower() == "true"
+# Hits fetched from each side before fusion and deduplication
+RETRIEVER_CANDIDATES = int(os.getenv("RETRIEVER_CANDIDATES", "20"))
+# Re-rank the fused hits for diversity (maximal marginal relevance)
+RETRIEVER_MMR = os.getenv("RETRIEVER_MMR", "false").lower() == "true"
+
+
+def _matches(hit, filters):
+    for field, value in (filters or {}).items():
+        allowed = value if isinstance(value, (list, tuple, set)) else [value]
+        if hit.get(field) not in allowed:
+            return False
+    return True
+
+
+_keyword_index = None
+
+def get_keyword_index():
+    """Process-wide BM25 index, so each retriever doesn't reload it from disk."""
+    global _keyword_index
+    if _keyword_index is None:
+        _keyword_index = BM25Index(LOCAL_INDEX_DIR)
+    return _keyword_index
+
+
 class ContextRetriever:
-    def __init__(self):
-        self.db_params = {
-            "dbname": os.getenv("PG_DB"),
-            "user": os.getenv("PG_USER"),
-            "password": os.getenv("PG_PASSWORD"),
-            "host": os.getenv("PG_HOST"),
-            "port": os.getenv("PG_PORT")
-        }
-
-    def _get_embedding(self, query: str):
+    def __init__(self, backend=None, keyword_index=None):
+        self.backend = backend or get_backend()
+        self.keyword_index = keyword_index or get_keyword_index()
+
+    def _keyword_search(self, query, limit, filters):
+        if not RETRIEVER_HYBRID or not self.keyword_index.available():
+            return []
         try:
-            response = genai.embed_content(
-                model="models/embedding-001",
-                content=query,
-                task_type="retrieval_query"
-            )
-            return response["embedding"]
+            hits = self.keyword_index.search(query, limit if not filters else limit * 4)
+            return [hit for hit in hits if _matches(hit, filters)][:limit]
         except Exception as e:
-            print(f"❌ Error generating embedding: {e}")
-            return None
+            instrumentation.log(f"❌ Error searching keyword index: {e}", level="error")
+            return []
+
+    def _combine(self, vector_hits, keyword_hits, top_k):
+        # Always fused, so every hit carries an rrf_score even when only one list has hits
+        hits = dedupe_overlaps(rrf_fuse(vector_hits, keyword_hits))
+        return mmr(hits, top_k) if RETRIEVER_MMR else hits[:top_k]
 
-    def _connect_db(self):
+    def embed_query(self, query: str):
         try:
-            return psycopg2.connect(**self.db_params)
+            with instrumentation.span("embedding", engine="query"):
+                response = genai.embed_content(
+                    model="models/embedding-001",
+                    content=query,
+                    task_type="retrieval_query"
+                )
+            return response["embedding"]
         except Exception as e:
-            print(f"❌ Error connecting to Neon DB: {e}")
+            instrumentation.log(f"❌ Error generating embedding: {e}", level="error")
             return None
 
-    def retrieve(self, query: str, top_k: int = 5):
-        query_vector = self._get_embedding(query)
-        if not query_vector:
-            return []
+    def retrieve(self, query: str, top_k: int = 5, query_vector=None, filters=None):
+        """Hybrid top-k: vector and BM25 hits fused by reciprocal rank, overlaps removed."""
+        candidates = max(top_k, RETRIEVER_CANDIDATES)
+        # Callers with a precomputed embedding skip the embedding round trip
+        if query_vector is None:
+            query_vector = self.embed_query(query)
 
-        conn = self._connect_db()
-        if not conn:
-            return []
+        vector_hits = []
+        if query_vector:
+            try:
+                vector_hits = self.backend.search(query_vector, candidates, filters)
+            except Exception as e:
+                instrumentation.log(f"❌ Error retrieving data: {e}", level="error")
 
-        try:
-            cursor = conn.cursor()
-
-            vector_str = "[" + ", ".join(f"{x:.6f}" for x in query_vector) + "]"
-
-            cursor.execute("""
-                SELECT id, text, source, page
-                FROM pdf_embeddings
-                ORDER BY embedding <-> %s::vector
-                LIMIT %s;
-            """, (vector_str, top_k))
-
-            rows = cursor.fetchall()
-            cursor.close()
-            conn.close()
-
-            return [
-                {
-                    "id": row[0],
-                    "text": row[1],
-                    "source": row[2],
-                    "page": row[3]
-                } for row in rows
-            ]
-        except Exception as e:
-            print(f"❌ Error retrieving data: {e}")
-            return []
+        return self._combine(vector_hits, self._keyword_search(query, candidates, filters), top_k)
+
+    async def retrieve_async(self, query: str, top_k: int = 5, query_vector=None, filters=None):
+        """Async variant; the pgvector backend uses the asyncpg pool."""
+        candidates = max(top_k, RETRIEVER_CANDIDATES)
+        if query_vector is None:
+            query_vector = await asyncio.to_thread(self.embed_query, query)
+
+        vector_hits = []
+        if query_vector:
+            try:
+                vector_hits = await self.backend.search_async(query_vector, candidates, filters)
+            except Exception as e:
+                instrumentation.log(f"❌ Error retrieving data: {e}", level="error")
+
+        keyword_hits = await asyncio.to_thread(self._keyword_search, query, candidates, filters)
+        return self._combine(vector_hits, keyword_hits, top_k)
@@ -0,0 +1,73 @@
+# json_fields.py
+
+import json
+
+
+class JsonFieldEmitter:
+    """
+    Incremental scanner for a streamed top-level JSON object.
+
+    feed() takes the next piece of text and returns the (key, value) pairs of
+    the top-level fields that completed in it, so each field can be shown
+    before the rest of the object has been generated.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.expecting = "key"   # key -> colon -> value, at depth 1
+        self.key_start = None
+        self.key = None
+        self.value_start = None
+        self.done = False
+
+    def _emit(self, end, fields):
+        raw = self.buffer[self.value_start:end].strip()
+        fields.append((self.key, json.loads(raw)))
+        self.key = self.value_start = None
+        self.expecting = "key"
+
+    def feed(self, text):
+        self.buffer += text
+        fields = []
+        while self.pos < len(self.buffer) and not self.done:
+            char = self.buffer[self.pos]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.key_start is not None:
+                        self.key = json.loads(self.buffer[self.key_start:self.pos + 1])
+                        self.key_start = None
+                        self.expecting = "colon"
+                self.pos += 1
+                continue
+
+            if self.depth == 1 and self.expecting == "value" and self.value_start is None and not char.isspace():
+                self.value_start = self.pos
+
+            if char == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expecting == "key":
+                    self.key_start = self.pos
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    if self.value_start is not None:
+                        self._emit(self.pos, fields)
+                    self.done = True
+            elif self.depth == 1 and char == ":" and self.expecting == "colon":
+                self.expecting = "value"
+            elif self.depth == 1 and char == "," and self.value_start is not None:
+                self._emit(self.pos, fields)
+            self.pos += 1
+        return fields
@@ -15,16 +15,23 @@ def text_spliting(docs: list[Document]) -> list[str]:
         print("No documents provided for splitting.")
         return []
 
+    # Split each page on its own; joining everything first doubles peak memory
+    return [chunk.page_content for chunk in split_documents(docs)]
+
+
+def split_documents(docs: list[Document]) -> list[Document]:
+    """
+    Splits each Document into chunks, keeping its metadata (source, page) on every chunk.
+
+    Args:
+        docs (list[Document]): Langchain Document objects, e.g. the pages of a PDF.
+
+    Returns:
+        list[Document]: Chunk Documents, each carrying its parent's metadata.
+    """
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=2048,
         chunk_overlap=512,
     )
 
-    # Extract page_content from each Document object and join them into a single string
-    # before passing to split_text. Use a suitable separator like double newline.
-    all_text = "\n\n".join([doc.page_content for doc in docs])
-
-    # Perform the split on the combined text
-    chunks = splitter.split_text(all_text)
-
-    return chunks
\ No newline at end of file
+    return splitter.split_documents(docs)
@@ -1,12 +1,16 @@
 import os
 import json
 import google.generativeai as genai
-from google.generativeai.types import GenerationConfig
 from dotenv import load_dotenv
+from pydantic import BaseModel
+from typing import List
 
 from ReportGeneration.Retriever.retriever import ContextRetriever
-from ReportGeneration.Query.query_generation import QueryGenerator
-from shared_state import stored_job_info, stored_audio_transcripts, stored_video_analysis, questions_generated
+from ReportGeneration.Query.query_cache import get_report_query
+from ReportGeneration.Prompt.prompt_builder import build_report_prompt
+from ReportGeneration.Streaming.json_fields import JsonFieldEmitter
+from llm_cache import generate_text, stream_text
+import instrumentation
 
 # Load environment variables
 load_dotenv()
@@ -27,6 +31,21 @@ simplified_json_schema = {
     "required": ["summary", "technical_feedback", "behavioral_feedback", "communication_feedback", "suggestions"]
 }
 
+class InterviewReport(BaseModel):
+    summary: str
+    technical_feedback: str
+    behavioral_feedback: str
+    communication_feedback: str
+    suggestions: List[str]
+
+REPORT_MODEL = "gemini-2.5-flash"
+REPORT_GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "temperature": 0.5,
+    "top_p": 0.9,
+    "max_output_tokens": 2048,
+}
+
 # --- System Instruction ---
 system_instruction_text = """
 You are an expert interview analyst AI. You will generate a detailed, structured report in JSON format using:
@@ -46,60 +65,82 @@ Use all the above data to create:
 Return response in strict JSON only. Use plain, professional language.
 """
 
-# --- Main Function ---
-def generate_interview_report():
-    try:
-        # Generate Query
-        query_gen = QueryGenerator()
-        expanded_query = query_gen.generate("Give me the best interview tips, tricks, feedbacks")
+# --- Main Functions ---
+def validate_report(text: str):
+    return InterviewReport(**json.loads(text.strip()))
 
-        # Retrieve context
-        retriever = ContextRetriever()
-        context_chunks = retriever.retrieve(expanded_query)
 
-        # Format context
-        formatted_chunks = "\n\n".join(
-            [f"Source: {chunk['source']} | Page: {chunk['page']}\n{chunk['text']}" for chunk in context_chunks]
-        )
+def build_prompt(session: dict) -> str:
+    """Retrieve knowledge base context and assemble the report prompt for one session record."""
+    # Precomputed query expansion + embedding (no network hops when warm)
+    expanded_query, query_vector = get_report_query(session["job_info"].get("job_role"))
 
-        # Compose full prompt
-        prompt = f"""
-=== Retrieved Context ===
-{formatted_chunks}
+    # Retrieve context
+    retriever = ContextRetriever()
+    context_chunks = retriever.retrieve(expanded_query, query_vector=query_vector)
 
-=== Job Info ===
-{stored_job_info}
+    # Compact, token-budgeted prompt (size no longer grows with interview length)
+    prompt, prompt_stats = build_report_prompt(session, context_chunks)
+    instrumentation.log(
+        f"📏 Report prompt: {prompt_stats['total_tokens']}/{prompt_stats['budget']} tokens {prompt_stats['sections']}"
+        + (f", truncated {prompt_stats['truncated']}" if prompt_stats['truncated'] else ""),
+        total_tokens=prompt_stats['total_tokens'], budget=prompt_stats['budget'],
+        sections=prompt_stats['sections'], truncated=prompt_stats['truncated'],
+    )
+    return prompt
 
-=== Questions Asked ===
-{questions_generated}
 
-=== Audio Transcript ===
-{stored_audio_transcripts}
+def generate_interview_report(session: dict, use_cache: bool = True):
+    """Build the report for one session record (see session_store.get_session)."""
+    try:
+        prompt = build_prompt(session)
+
+        # Gemini call (identical session data is answered from the LLM cache)
+        response_text = generate_text(
+            model_name=REPORT_MODEL,
+            prompt=prompt,
+            system_instruction=system_instruction_text,
+            generation_config=REPORT_GENERATION_CONFIG,
+            response_schema=simplified_json_schema,
+            use_cache=use_cache,
+            validate=validate_report,
+        )
 
-=== Video Emotion Analysis ===
-{stored_video_analysis}
-"""
+        # Parse, validate and return JSON result
+        return InterviewReport(**json.loads(response_text.strip())).model_dump()
 
-        # Gemini call
-        model = genai.GenerativeModel(
-            model_name="gemini-2.5-flash",
-            system_instruction=system_instruction_text
-        )
+    except Exception as e:
+        instrumentation.log(f"❌ Error generating interview report: {e}", level="error")
+        return None
 
-        response = model.generate_content(
-            contents=prompt,
-            generation_config=GenerationConfig(
-                response_mime_type="application/json",
-                response_schema=simplified_json_schema,
-                temperature=0.5,
-                top_p=0.9,
-                max_output_tokens=2048,
-            )
-        )
 
-        # Parse and return JSON result
-        return json.loads(response.text.strip())
+def stream_interview_report(session: dict, use_cache: bool = True):
+    """
+    Generate the report with Gemini's streaming API.
+
+    Yields ("field", {"name", "value"}) as each top-level report field
+    completes, then ("report", validated_report), or ("error", message).
+    """
+    try:
+        prompt = build_prompt(session)
+
+        emitter = JsonFieldEmitter()
+        pieces = []
+        for piece in stream_text(
+            model_name=REPORT_MODEL,
+            prompt=prompt,
+            system_instruction=system_instruction_text,
+            generation_config=REPORT_GENERATION_CONFIG,
+            response_schema=simplified_json_schema,
+            use_cache=use_cache,
+            validate=validate_report,
+        ):
+            pieces.append(piece)
+            for name, value in emitter.feed(piece):
+                yield "field", {"name": name, "value": value}
+
+        yield "report", validate_report("".join(pieces)).model_dump()
 
     except Exception as e:
-        print(f"❌ Error generating interview report: {e}")
-        return None
+        instrumentation.log(f"❌ Error streaming interview report: {e}", level="error")
+        yield "error", str(e)
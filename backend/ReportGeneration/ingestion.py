@@ -1,35 +1,100 @@
-# Import functions from individual modules
-from DocumentLoader.loader import document_loader
-from TextSpliter.spliter import text_spliting
-from EmbeddingGeneration.generator import embedding_generation,store_embeddings_in_chromadb
+# Incremental ingestion of the knowledge base into ChromaDB.
+# Run from backend/: python -m ReportGeneration.ingestion
+#
+# A manifest records each PDF's hash and the ids of the chunks it produced.
+# Unchanged PDFs are skipped, only chunks that are not stored yet are embedded,
+# and chunks of changed or removed PDFs are deleted. PDFs are parsed in a
+# process pool and their chunks streamed to the embedder in batches.
 
+import os
+
+from ReportGeneration.DocumentLoader.loader import KNOWLEDGE_BASE_DIR, INGEST_WORKERS, list_pdfs, iter_pdfs
+from ReportGeneration.TextSpliter.spliter import split_documents
+from ReportGeneration.EmbeddingGeneration.generator import (
+    embedding_generation, store_embeddings_in_chromadb, delete_chunks_from_chromadb
+)
+from ReportGeneration.Retriever.local_store import LOCAL_INDEX_DIR, EMBEDDINGS_FILE, build_from_chroma
+from ReportGeneration.Manifest.manifest import IngestionManifest, file_sha256, chunk_ids
+
+# Chunks handed to the embedding engine per call; it splits them into
+# concurrent API-sized batches, so this should span several of those
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "500"))
+
+
+def ingest_file(manifest, source, sha256, pages):
+    """Split one PDF's pages, embed only its new chunks and drop the ones it no longer has."""
+    chunks = split_documents(pages)
+    pairs = chunk_ids(source, [chunk.page_content for chunk in chunks])
+
+    stored = manifest.chunks(source)
+    new = [(chunk_id, chunk) for (chunk_id, _), chunk in zip(pairs, chunks) if chunk_id not in stored]
+
+    for start in range(0, len(new), INGEST_EMBED_BATCH_SIZE):
+        batch = new[start:start + INGEST_EMBED_BATCH_SIZE]
+        texts = [chunk.page_content for _, chunk in batch]
+        generated_embeddings = embedding_generation(texts)
+        store_embeddings_in_chromadb(
+            generated_embeddings, texts, ids=[chunk_id for chunk_id, _ in batch],
+            metadatas=[{"source": source, "page": chunk.metadata.get("page", -1)} for _, chunk in batch],
+        )
+
+    current = dict(pairs)
+    stale_ids = [chunk_id for chunk_id in stored if chunk_id not in current]
+    delete_chunks_from_chromadb(stale_ids)
+
+    manifest.update(source, sha256, current)
+    return len(new), len(stale_ids)
+
+
+def main(path=KNOWLEDGE_BASE_DIR):
 
-def main():
-    
     print("--- Starting Document Processing Pipeline ---")
 
-    # Step 1: Load documents
-    loaded_documents = document_loader()
-    if not loaded_documents:
-        print("No documents loaded. Pipeline halted.")
-        return
+    manifest = IngestionManifest()
 
-    # Step 2: Split documents into chunks
-    text_chunks = text_spliting(loaded_documents)
-    if not text_chunks:
-        print("No text chunks generated. Pipeline halted.")
+    # Step 1: Find the PDFs
+    pdfs = {os.path.relpath(pdf, path).replace(os.sep, "/"): pdf for pdf in list_pdfs(path)}
+    if not pdfs:
+        print("No documents found. Pipeline halted.")
         return
 
-    # Step 3: Generate embeddings for chunks
-    generated_embeddings = embedding_generation(text_chunks)
-    if not generated_embeddings:
-        print("No embeddings generated. Pipeline halted.")
-        return
+    # Step 2: Remove chunks of PDFs that were deleted
+    removed = [source for source in manifest.files if source not in pdfs]
+    for source in removed:
+        delete_chunks_from_chromadb(list(manifest.chunks(source)))
+        manifest.remove(source)
+        print(f"🗑️ {source} removed")
+
+    # Step 3: Hash every PDF and keep only the new and changed ones
+    changed = {}
+    for source, pdf in pdfs.items():
+        sha256 = file_sha256(pdf)
+        if manifest.file_hash(source) != sha256:
+            changed[pdf] = (source, sha256)
+    skipped = len(pdfs) - len(changed)
+
+    # Step 4: Parse changed PDFs in parallel and ingest each as soon as it is ready
+    embedded = 0
+    for pdf, pages, error in iter_pdfs(changed, workers=min(INGEST_WORKERS, len(changed))):
+        source, sha256 = changed[pdf]
+        try:
+            if error is not None:
+                raise error
+            added, deleted = ingest_file(manifest, source, sha256, pages)
+            embedded += added
+            print(f"📄 {source}: {added} chunks embedded, {deleted} removed")
+        except Exception as e:
+            # Manifest is saved per file, so the next run retries only what failed
+            print(f"❌ Failed to ingest {source}: {e}")
 
-    # Step 4: Store embeddings and chunks in ChromaDB
-    store_embeddings_in_chromadb(generated_embeddings, text_chunks)
+    # Step 5: Rebuild the local retrieval index from the updated collection
+    if changed or removed or not os.path.exists(os.path.join(LOCAL_INDEX_DIR, EMBEDDINGS_FILE)):
+        try:
+            build_from_chroma()
+        except Exception as e:
+            print(f"❌ Failed to build the local index: {e}")
 
-    print("--- Document Processing Pipeline Completed ---")
+    print(f"--- Document Processing Pipeline Completed: {embedded} chunks embedded, {skipped} files unchanged ---")
 
 # Entry point for the script
 if __name__ == "__main__":
@@ -1,33 +1,49 @@
 # emotion_model.py
 
 import os
-import requests
-import json
 import cv2
-import tempfile
 from dotenv import load_dotenv
+import http_client
+import instrumentation
 
 load_dotenv()
 
-API_TOKEN = os.getenv('LUXAND_API_KEY')
+API_TOKEN = os.getenv('LUXAND_API_KEY', '')
 LUXAND_URL = "https://api.luxand.cloud/photo/emotions"
 HEADERS = {"token": API_TOKEN}
 
+def _photo_upload(frame):
+    ok, encoded = cv2.imencode('.jpg', frame)
+    if not ok:
+        return None
+    return {"photo": ("frame.jpg", encoded.tobytes(), "image/jpeg")}
+
+def _parse_response(response):
+    if response.status_code == 200:
+        return response.json()  # Luxand response
+    else:
+        instrumentation.log(f"❌ Can't recognize people: {response.text}", level="error")
+        return None
+
 def emotions_from_frame(frame):
     """
-    Takes a single video frame (numpy array), saves it temporarily, sends it to Luxand API,
+    Takes a single video frame (numpy array), encodes it as JPEG in memory, sends it to Luxand API,
     and returns the detected emotions.
     """
-    with tempfile.NamedTemporaryFile(suffix='.jpg', delete=True) as temp_img:
-        # Save frame as temporary image
-        cv2.imwrite(temp_img.name, frame)
-        
-        with open(temp_img.name, "rb") as image_file:
-            files = {"photo": image_file}
-            response = requests.post(LUXAND_URL, headers=HEADERS, files=files)
-
-        if response.status_code == 200:
-            return response.json()  # Luxand response
-        else:
-            print("❌ Can't recognize people:", response.text)
-            return None
+    files = _photo_upload(frame)
+    if files is None:
+        instrumentation.log("❌ Can't encode frame for Luxand", level="error")
+        return None
+
+    response = http_client.request_sync("POST", LUXAND_URL, headers=HEADERS, files=files)
+    return _parse_response(response)
+
+async def emotions_from_frame_async(frame):
+    """Async variant of emotions_from_frame for use inside request handlers."""
+    files = _photo_upload(frame)
+    if files is None:
+        instrumentation.log("❌ Can't encode frame for Luxand", level="error")
+        return None
+
+    response = await http_client.request("POST", LUXAND_URL, headers=HEADERS, files=files)
+    return _parse_response(response)
@@ -0,0 +1,135 @@
+# face_detection.py
+
+import os
+import cv2
+
+# Detector backend: "haar" (bundled with OpenCV) or "dnn" (res10 SSD, needs the model files below)
+FACE_DETECTOR = os.getenv("FACE_DETECTOR", "haar")
+FACE_DNN_PROTOTXT = os.getenv("FACE_DNN_PROTOTXT", "")
+FACE_DNN_MODEL = os.getenv("FACE_DNN_MODEL", "")
+FACE_DNN_CONFIDENCE = float(os.getenv("FACE_DNN_CONFIDENCE", "0.5"))
+
+# Frames are shrunk to this width before a full-frame detection
+DETECTION_WIDTH = int(os.getenv("FACE_DETECTION_WIDTH", "320"))
+
+# Run a full-frame detection at least this often while tracking
+REDETECT_EVERY = int(os.getenv("FACE_REDETECT_EVERY", "10"))
+
+# How far (relative to the box size) the search window grows around the last face
+TRACK_MARGIN = 0.5
+
+# Extra context kept around the face when cropping for the classifier
+CROP_MARGIN = 0.1
+
+
+class FaceDetector:
+    """Finds the largest face in a grayscale frame using an offline OpenCV detector."""
+
+    def __init__(self, backend=None):
+        self.backend = backend or FACE_DETECTOR
+        if self.backend == "dnn":
+            if not (FACE_DNN_PROTOTXT and FACE_DNN_MODEL):
+                raise ValueError("❌ FACE_DNN_PROTOTXT and FACE_DNN_MODEL must be set for the dnn face detector.")
+            self.net = cv2.dnn.readNetFromCaffe(FACE_DNN_PROTOTXT, FACE_DNN_MODEL)
+        else:
+            if not hasattr(cv2, "CascadeClassifier"):
+                raise ValueError("❌ This OpenCV build has no Haar cascades; install opencv-python<5 or use FACE_DETECTOR=dnn.")
+            cascade_path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+            self.cascade = cv2.CascadeClassifier(cascade_path)
+
+    def detect(self, gray):
+        """Return the largest face as (x, y, w, h) in frame coordinates, or None."""
+        height, width = gray.shape[:2]
+        scale = min(DETECTION_WIDTH / width, 1.0)
+        small = cv2.resize(gray, (int(width * scale), int(height * scale))) if scale < 1.0 else gray
+
+        boxes = self._detect_dnn(small) if self.backend == "dnn" else self._detect_haar(small)
+        if not boxes:
+            return None
+
+        x, y, w, h = max(boxes, key=lambda box: box[2] * box[3])
+        return (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+
+    def _detect_haar(self, gray):
+        min_side = max(min(gray.shape[:2]) // 8, 20)
+        faces = self.cascade.detectMultiScale(
+            gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side)
+        )
+        return [tuple(face) for face in faces]
+
+    def _detect_dnn(self, gray):
+        height, width = gray.shape[:2]
+        bgr = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+        blob = cv2.dnn.blobFromImage(bgr, 1.0, (300, 300), (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward()[0, 0]
+
+        boxes = []
+        for detection in detections:
+            if detection[2] < FACE_DNN_CONFIDENCE:
+                continue
+            x1, y1 = max(int(detection[3] * width), 0), max(int(detection[4] * height), 0)
+            x2, y2 = min(int(detection[5] * width), width), min(int(detection[6] * height), height)
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2 - x1, y2 - y1))
+        return boxes
+
+
+class FaceTracker:
+    """
+    Keeps a face box across consecutive frames of one clip.
+
+    After a face is found, later frames are searched only in a window around
+    the previous box; a full-frame detection runs again when the face is lost
+    or every REDETECT_EVERY frames.
+    """
+
+    def __init__(self, detector=None, redetect_every=REDETECT_EVERY):
+        self.detector = detector or get_face_detector()
+        self.redetect_every = redetect_every
+        self.box = None
+        self.frames_since_detection = 0
+
+    def locate(self, gray):
+        """Return the face box (x, y, w, h) for this frame, or None if no face is in view."""
+        if self.box is not None and self.frames_since_detection < self.redetect_every:
+            box = self._search_near(gray, self.box)
+            if box is not None:
+                self.box = box
+                self.frames_since_detection += 1
+                return box
+
+        self.box = self.detector.detect(gray)
+        self.frames_since_detection = 0
+        return self.box
+
+    def _search_near(self, gray, box):
+        height, width = gray.shape[:2]
+        x, y, w, h = box
+        dx, dy = int(w * TRACK_MARGIN), int(h * TRACK_MARGIN)
+        x1, y1 = max(x - dx, 0), max(y - dy, 0)
+        x2, y2 = min(x + w + dx, width), min(y + h + dy, height)
+
+        found = self.detector.detect(gray[y1:y2, x1:x2])
+        if found is None:
+            return None
+        fx, fy, fw, fh = found
+        return (fx + x1, fy + y1, fw, fh)
+
+
+def crop_face(gray, box, margin=CROP_MARGIN):
+    """Crop the face box (plus a small margin) out of a grayscale frame."""
+    height, width = gray.shape[:2]
+    x, y, w, h = box
+    dx, dy = int(w * margin), int(h * margin)
+    return gray[max(y - dy, 0):min(y + h + dy, height), max(x - dx, 0):min(x + w + dx, width)]
+
+
+_detector = None
+
+def get_face_detector():
+    """Return the process-wide face detector, creating it on first use."""
+    global _detector
+    if _detector is None:
+        _detector = FaceDetector()
+    return _detector
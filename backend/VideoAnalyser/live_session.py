@@ -0,0 +1,94 @@
+# live_session.py
+
+import os
+import time
+from collections import Counter
+
+# Most timeline points kept per session; older points are thinned out beyond this
+TIMELINE_MAX_POINTS = int(os.getenv("VIDEO_TIMELINE_MAX_POINTS", "600"))
+
+
+class EmotionAggregator:
+    """
+    Rolling summary of the emotions seen during one interview session.
+
+    Keeps an emotion histogram, per-emotion confidence averages and a bounded
+    timeline, so the report gets the whole session without storing every frame.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.frames_received = 0
+        self.frames_with_face = 0
+        self.histogram = Counter()
+        self.confidence_sums = Counter()
+        self.timeline = []
+        self.timeline_step = 1  # keep every Nth point once the timeline is full
+        self._points_seen = 0
+
+    def add(self, results, timestamp=None):
+        """Fold a batch of per-frame results (as returned by video_processing) into the summary."""
+        elapsed = round((timestamp or time.time()) - self.started_at, 1)
+        for result in results:
+            self.frames_received += 1
+            if "emotion" not in result:
+                continue
+
+            self.frames_with_face += 1
+            self.histogram[result["emotion"]] += 1
+            self.confidence_sums[result["emotion"]] += result["confidence"]
+            self._add_point({"t": elapsed, "emotion": result["emotion"], "confidence": result["confidence"]})
+
+    def _add_point(self, point):
+        self._points_seen += 1
+        if self._points_seen % self.timeline_step:
+            return
+        self.timeline.append(point)
+        if len(self.timeline) > TIMELINE_MAX_POINTS:
+            # Halve the resolution instead of dropping the start of the session
+            self.timeline = self.timeline[::2]
+            self.timeline_step *= 2
+
+    def dominant_emotion(self):
+        return self.histogram.most_common(1)[0][0] if self.histogram else None
+
+    def summary(self):
+        return {
+            "frames_received": self.frames_received,
+            "frames_with_face": self.frames_with_face,
+            "duration_seconds": round(time.time() - self.started_at, 1),
+            "dominant_emotion": self.dominant_emotion(),
+            "emotion_histogram": dict(self.histogram),
+            "average_confidence": {
+                emotion: round(self.confidence_sums[emotion] / count, 3)
+                for emotion, count in self.histogram.items()
+            },
+            "timeline": list(self.timeline),
+        }
+
+    def to_dict(self):
+        """Everything needed to resume the aggregate in another request or worker."""
+        return {
+            "started_at": self.started_at,
+            "frames_received": self.frames_received,
+            "frames_with_face": self.frames_with_face,
+            "histogram": dict(self.histogram),
+            "confidence_sums": dict(self.confidence_sums),
+            "timeline": self.timeline,
+            "timeline_step": self.timeline_step,
+            "points_seen": self._points_seen,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        aggregator = cls()
+        if state:
+            aggregator.started_at = state["started_at"]
+            aggregator.frames_received = state["frames_received"]
+            aggregator.frames_with_face = state["frames_with_face"]
+            aggregator.histogram = Counter(state["histogram"])
+            aggregator.confidence_sums = Counter(state["confidence_sums"])
+            aggregator.timeline = list(state["timeline"])
+            aggregator.timeline_step = state["timeline_step"]
+            aggregator._points_seen = state["points_seen"]
+        return aggregator
@@ -0,0 +1,137 @@
+# model_registry.py
+
+import os
+import threading
+import numpy as np
+
+# Inference backend for the emotion model: "keras" (.h5), "onnx" (ONNX Runtime) or "tflite"
+EMOTION_MODEL_BACKEND = os.getenv("EMOTION_MODEL_BACKEND", "keras")
+EMOTION_MODEL_PATH = os.getenv("EMOTION_MODEL_PATH", "")
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_FILES = {
+    "keras": "facialemotionmodel.h5",
+    "onnx": "facialemotionmodel.onnx",
+    "tflite": "facialemotionmodel.tflite",
+}
+
+# Shape of a single preprocessed frame (height, width, channels)
+INPUT_SHAPE = (48, 48, 1)
+
+
+class KerasBackend:
+    """Runs the original .h5 model through TensorFlow/Keras."""
+
+    def __init__(self, path):
+        from tensorflow.keras.models import load_model
+        self.model = load_model(path, compile=False)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class OnnxBackend:
+    """Runs a converted model with ONNX Runtime on CPU."""
+
+    def __init__(self, path):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class TFLiteBackend:
+    """Runs a converted model with the TFLite interpreter (tflite-runtime if installed)."""
+
+    def __init__(self, path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=path)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size = 1
+        self.lock = threading.Lock()  # the interpreter keeps per-call state
+
+    def predict(self, batch):
+        with self.lock:
+            if len(batch) != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(batch)
+            self.interpreter.set_tensor(self.input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+BACKENDS = {
+    "keras": KerasBackend,
+    "onnx": OnnxBackend,
+    "tflite": TFLiteBackend,
+}
+
+_model = None
+_lock = threading.Lock()
+
+def _model_path(backend):
+    return EMOTION_MODEL_PATH or os.path.join(MODEL_DIR, DEFAULT_MODEL_FILES[backend])
+
+def get_emotion_model():
+    """
+    Return the process-wide emotion model, loading it on first use.
+
+    The backend is picked by EMOTION_MODEL_BACKEND; every backend exposes
+    predict(batch) -> (N, len(EMOTIONS)) probabilities.
+    """
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                backend = EMOTION_MODEL_BACKEND
+                if backend not in BACKENDS:
+                    raise ValueError(f"❌ Unknown EMOTION_MODEL_BACKEND '{backend}'. Use one of: {', '.join(BACKENDS)}")
+                _model = BACKENDS[backend](_model_path(backend))
+    return _model
+
+def warm_up():
+    """Load the model and run one dummy batch so the first real request pays no setup cost."""
+    model = get_emotion_model()
+    model.predict(np.zeros((1, *INPUT_SHAPE), dtype=np.float32))
+    return model
+
+def convert_model(target, source=None, output=None):
+    """
+    Convert the Keras .h5 model to an ONNX or TFLite file for the lighter backends.
+
+    Needs TensorFlow (and tf2onnx for ONNX) on the machine doing the conversion only.
+    """
+    import tensorflow as tf
+    source = source or os.path.join(MODEL_DIR, DEFAULT_MODEL_FILES["keras"])
+    output = output or os.path.join(MODEL_DIR, DEFAULT_MODEL_FILES[target])
+    model = tf.keras.models.load_model(source, compile=False)
+
+    if target == "onnx":
+        import tf2onnx
+        signature = (tf.TensorSpec((None, *INPUT_SHAPE), tf.float32, name="input"),)
+        tf2onnx.convert.from_keras(model, input_signature=signature, output_path=output)
+    elif target == "tflite":
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        with open(output, "wb") as f:
+            f.write(converter.convert())
+    else:
+        raise ValueError(f"❌ Cannot convert to '{target}'. Use 'onnx' or 'tflite'.")
+
+    print(f"✅ Saved {target} model to {output}")
+    return output
+
+# Entry point for one-off conversion: python -m VideoAnalyser.model_registry onnx
+if __name__ == "__main__":
+    import sys
+    convert_model(sys.argv[1] if len(sys.argv) > 1 else "onnx")
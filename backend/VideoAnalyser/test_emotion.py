@@ -1,13 +1,16 @@
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
+from VideoAnalyser.model_registry import get_emotion_model
+import instrumentation
 
-# Load the trained model once
-model = load_model(r'VideoAnalyser\facialemotionmodel.h5')
+# The model itself is loaded lazily by the registry on first prediction
 
 # Define the emotion labels corresponding to the model's output classes
 EMOTIONS = ['Angry', 'Disgust', 'Fear', 'Happy', 'Anxious', 'Surprise', 'Neutral', 'Confident']
 
+# Default number of frames sent to the model in a single call
+DEFAULT_BATCH_SIZE = 32
+
 def preprocess_frame(frame, target_size=(48, 48)):
     """
     Preprocess a video frame:
@@ -16,11 +19,28 @@ def preprocess_frame(frame, target_size=(48, 48)):
     - Normalize pixel values
     - Reshape for model input
     """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    resized = cv2.resize(gray, target_size)
-    normalized = resized / 255.0
-    reshaped = np.reshape(normalized, (1, target_size[0], target_size[1], 1))
-    return reshaped
+    return preprocess_frames([frame], target_size)
+
+def preprocess_frames(frames, target_size=(48, 48)):
+    """
+    Preprocess a list of BGR frames into one contiguous model batch.
+
+    Each frame is converted to grayscale and resized straight into a
+    preallocated uint8 buffer; normalisation is then applied to the whole
+    batch at once.
+
+    Returns:
+        np.ndarray: float32 array of shape (N, height, width, 1)
+    """
+    width, height = target_size
+    batch = np.empty((len(frames), height, width), dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        cv2.resize(gray, target_size, dst=batch[i], interpolation=cv2.INTER_AREA)
+
+    normalized = batch.astype(np.float32)
+    normalized *= 1.0 / 255.0
+    return normalized[..., np.newaxis]
 
 def predict_emotion(frame):
     """
@@ -30,9 +50,25 @@ def predict_emotion(frame):
         emotion_label (str): The predicted emotion name
         confidence (float): The confidence score between 0 and 1
     """
-    processed = preprocess_frame(frame)
-    predictions = model.predict(processed, verbose=0)[0]
-    top_index = np.argmax(predictions)
-    emotion_label = EMOTIONS[top_index]
-    confidence = float(predictions[top_index])
-    return emotion_label, confidence
+    return predict_emotions([frame], batch_size=1)[0]
+
+def predict_emotions(frames, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Predict emotions for a list of frames, calling the model once per batch.
+
+    Returns:
+        list[tuple[str, float]]: (emotion_label, confidence) for every frame, in order
+    """
+    model = get_emotion_model()
+    results = []
+    for start in range(0, len(frames), batch_size):
+        processed = preprocess_frames(frames[start:start + batch_size])
+        with instrumentation.span("emotion_inference"):
+            predictions = model.predict(processed)
+        top_indices = np.argmax(predictions, axis=1)
+        confidences = predictions[np.arange(len(top_indices)), top_indices]
+        results.extend(
+            (EMOTIONS[index], float(confidence))
+            for index, confidence in zip(top_indices, confidences)
+        )
+    return results
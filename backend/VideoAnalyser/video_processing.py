@@ -1,47 +1,231 @@
+import os
 import cv2
 import tempfile
+from contextlib import contextmanager
 import numpy as np
-from VideoAnalyser.test_emotion import predict_emotion  # Import the real model
+from VideoAnalyser.test_emotion import predict_emotions  # Import the real model
+from VideoAnalyser.face_detection import FaceTracker, crop_face
+import instrumentation
 
-def process_video(video_bytes):
-    # Save the incoming video bytes to a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as tmp:
-        tmp.write(video_bytes)
-        tmp_path = tmp.name
+# Sampling policy: "every_n" (every Nth frame), "fps" (N frames per second of video)
+# or "uniform" (N frames spread evenly across the clip)
+SAMPLING_POLICY = os.getenv("VIDEO_SAMPLING_POLICY", "fps")
+SAMPLING_VALUE = float(os.getenv("VIDEO_SAMPLING_VALUE", "2"))
+INFERENCE_BATCH_SIZE = int(os.getenv("VIDEO_INFERENCE_BATCH_SIZE", "32"))
 
-    cap = cv2.VideoCapture(tmp_path)
+# Upper bound on frames scored per clip, whatever the policy
+MAX_SAMPLED_FRAMES = int(os.getenv("VIDEO_MAX_SAMPLED_FRAMES", "300"))
 
-    if not cap.isOpened():
-        return {"error": "❌ Failed to open video file"}
+# Crop the largest face before classification and skip frames with nobody in view
+FACE_DETECTION_ENABLED = os.getenv("VIDEO_FACE_DETECTION", "true").lower() == "true"
 
-    frame_count = 0
-    emotions_detected = []
+# Directory for the short-lived copies of real video uploads (e.g. /dev/shm)
+VIDEO_TMP_DIR = os.getenv("VIDEO_TMP_DIR") or None
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
+# Leading bytes of the still-image formats the browser can send
+IMAGE_SIGNATURES = (
+    b"\xff\xd8\xff",          # JPEG
+    b"\x89PNG\r\n\x1a\n",     # PNG
+    b"BM",                    # BMP
+)
+
+def is_image(data):
+    """Detect a single still image from its magic bytes."""
+    head = bytes(data[:12])
+    if head.startswith(IMAGE_SIGNATURES):
+        return True
+    # WebP: "RIFF" <size> "WEBP"
+    return head[:4] == b"RIFF" and head[8:12] == b"WEBP"
+
+def decode_image(data):
+    """
+    Decode an image straight from the request buffer.
+
+    np.frombuffer gives a zero-copy view over the bytes, so the only
+    allocation is the decoded BGR frame itself. Returns None if undecodable.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+@contextmanager
+def _video_file(video_bytes):
+    """Write a video container to a temp file that is always removed afterwards."""
+    fd, tmp_path = tempfile.mkstemp(suffix='.webm', dir=VIDEO_TMP_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(video_bytes)
+        yield tmp_path
+    finally:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+def _sample_indices(policy, value, total_frames):
+    """
+    Work out which frame indices to score.
+
+    Returns a sorted array of indices, or None when the set cannot be known
+    up front and a stride is applied while reading instead (the "uniform"
+    policy falls back to every frame when the container reports no frame count).
+    """
+    if policy == "uniform":
+        if total_frames <= 0:
+            return None
+        count = min(int(value), total_frames, MAX_SAMPLED_FRAMES)
+        return np.unique(np.linspace(0, total_frames - 1, num=max(count, 1)).round().astype(int))
+    return None
+
+def _frame_stride(policy, value, fps):
+    if policy == "fps":
+        if fps <= 0 or value <= 0:
+            return 1
+        return max(int(round(fps / value)), 1)
+    if policy == "every_n":
+        return max(int(value), 1)
+    return 1
+
+def _iter_sampled_frames(cap, policy, value):
+    """
+    Yield (frame_index, frame) for the sampled frames only.
+
+    Frames that are skipped are grabbed but never decoded into an image.
+    """
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+
+    indices = _sample_indices(policy, value, total_frames)
+    wanted = set(indices.tolist()) if indices is not None else None
+    last_wanted = int(indices[-1]) if indices is not None else None
+    stride = _frame_stride(policy, value, fps)
+
+    index = 0
+    sampled = 0
+    while sampled < MAX_SAMPLED_FRAMES:
+        if last_wanted is not None and index > last_wanted:
             break
+        if not cap.grab():
+            break
+
+        selected = index in wanted if wanted is not None else index % stride == 0
+        if selected:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            sampled += 1
+            yield index, frame
 
-        frame_count += 1
+        index += 1
 
-        # ✅ Real emotion detection using the imported model
+def _read_video_frames(video_bytes, policy, value):
+    """Decode the sampled frames of a video container. Returns (indices, frames, total_frames)."""
+    with _video_file(video_bytes) as tmp_path:
+        cap = cv2.VideoCapture(tmp_path)
         try:
-            emotion_label, confidence = predict_emotion(frame)
-            emotions_detected.append({
-                "emotion": emotion_label,
-                "confidence": round(confidence, 2)
-            })
+            if not cap.isOpened():
+                return [], None, 0
+
+            frame_indices = []
+            frames = []
+            for index, frame in _iter_sampled_frames(cap, policy, value):
+                frame_indices.append(index)
+                frames.append(frame)
+
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        finally:
+            cap.release()
+
+    return frame_indices, frames, total_frames
+
+def _locate_faces(frames):
+    """
+    Find the face in each frame, tracking it from one sampled frame to the next.
+
+    Returns a list of (box, face_crop) pairs; both are None when no face is present.
+    """
+    tracker = FaceTracker()
+    located = []
+    for frame in frames:
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        box = tracker.locate(gray)
+        located.append((box, crop_face(gray, box) if box is not None else None))
+    return located
+
+def _score_frames(frame_indices, frames, batch_size):
+    """Locate faces and classify emotions for decoded frames. Returns one result dict per frame."""
+    # 🙂 Face localisation: only frames with someone in view reach the classifier
+    if FACE_DETECTION_ENABLED:
+        with instrumentation.span("face_detection"):
+            located = _locate_faces(frames)
+        results = [
+            {"frame": index, "face": box is not None, "box": list(box) if box is not None else None}
+            for index, (box, _) in zip(frame_indices, located)
+        ]
+        targets = [(result, crop) for result, (_, crop) in zip(results, located) if crop is not None]
+    else:
+        results = [{"frame": index} for index in frame_indices]
+        targets = list(zip(results, frames))
+
+    # ✅ Real emotion detection, one model call per batch
+    for start in range(0, len(targets), batch_size):
+        batch = targets[start:start + batch_size]
+        try:
+            predictions = predict_emotions([image for _, image in batch], batch_size=batch_size)
+            for (result, _), (emotion_label, confidence) in zip(batch, predictions):
+                result["emotion"] = emotion_label
+                result["confidence"] = round(confidence, 2)
         except Exception as e:
-            emotions_detected.append({"error": str(e)})
+            for result, _ in batch:
+                result["error"] = str(e)
 
-        # Optional: Limit number of analyzed frames (for speed)
-        if frame_count >= 5:
-            break
+    return results
+
+def process_video(video_bytes, policy=None, value=None, batch_size=None):
+    policy = policy or SAMPLING_POLICY
+    value = SAMPLING_VALUE if value is None else value
+    batch_size = batch_size or INFERENCE_BATCH_SIZE
 
-    cap.release()
+    if is_image(video_bytes):
+        # ⚡ Fast path: a single webcam snapshot, decoded in memory
+        with instrumentation.span("frame_decode", source="image"):
+            frame = decode_image(video_bytes)
+        if frame is None:
+            return {"error": "❌ Failed to decode image"}
+        frame_indices, frames, total_frames = [0], [frame], 1
+    else:
+        with instrumentation.span("frame_decode", source="video"):
+            frame_indices, frames, total_frames = _read_video_frames(video_bytes, policy, value)
+        if frames is None:
+            return {"error": "❌ Failed to open video file"}
+
+    results = _score_frames(frame_indices, frames, batch_size)
 
     return {
-        "total_frames": frame_count,
-        "frames_analyzed": len(emotions_detected),
-        "emotion_analysis": emotions_detected
+        "total_frames": max(total_frames, frame_indices[-1] + 1 if frame_indices else 0),
+        "frames_analyzed": sum(1 for result in results if "emotion" in result),
+        "frames_with_face": sum(1 for result in results if result.get("face", True)),
+        "sampling": {"policy": policy, "value": value},
+        "emotion_analysis": results
     }
+
+def analyze_images(images, batch_size=None):
+    """
+    Score a batch of encoded still images (e.g. webcam snapshots from a live session).
+
+    Images are decoded in memory and the face is tracked across them in order.
+    Returns one result dict per image; undecodable images get an "error" entry.
+    """
+    batch_size = batch_size or INFERENCE_BATCH_SIZE
+
+    frame_indices, frames, failed = [], [], []
+    for index, data in enumerate(images):
+        with instrumentation.span("frame_decode", source="image"):
+            frame = decode_image(data) if is_image(data) else None
+        if frame is None:
+            failed.append({"frame": index, "error": "❌ Failed to decode image"})
+        else:
+            frame_indices.append(index)
+            frames.append(frame)
+
+    results = _score_frames(frame_indices, frames, batch_size) + failed
+    return sorted(results, key=lambda result: result["frame"])
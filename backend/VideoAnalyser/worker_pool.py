@@ -0,0 +1,135 @@
+# worker_pool.py
+
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentation
+
+# Number of worker processes (0 runs video work in the API process's thread pool instead)
+VIDEO_POOL_WORKERS = int(os.getenv("VIDEO_POOL_WORKERS", str(os.cpu_count() or 1)))
+
+# Tasks allowed to be running or queued at once before new ones are rejected
+VIDEO_POOL_MAX_PENDING = int(os.getenv("VIDEO_POOL_MAX_PENDING", str(max(VIDEO_POOL_WORKERS, 1) * 4)))
+
+# Seconds a caller waits for one task before giving up
+VIDEO_TASK_TIMEOUT = float(os.getenv("VIDEO_TASK_TIMEOUT", "30"))
+
+
+class PoolBusyError(Exception):
+    """Raised when the pool already has VIDEO_POOL_MAX_PENDING tasks in flight."""
+
+
+class PoolUnavailableError(Exception):
+    """Raised when the pool is not running or its worker processes died."""
+
+
+def _init_worker():
+    # Each worker process keeps its own warm copy of the model
+    from VideoAnalyser.model_registry import warm_up
+    try:
+        warm_up()
+    except Exception as e:
+        instrumentation.log(f"❌ Emotion model warm-up failed in worker {os.getpid()}: {e}", level="error")
+
+def _ping():
+    return os.getpid()
+
+def _run_task(fn, args, submitted_at, in_worker):
+    # Spans recorded in a worker process are handed back with the result and merged by the caller
+    instrumentation.observe("video_queue_wait", time.time() - submitted_at)
+    with instrumentation.span("video_task", task=fn.__name__):
+        result = fn(*args)
+    return result, instrumentation.registry.drain() if in_worker else None
+
+
+class VideoWorkerPool:
+    """
+    Bounded process pool for CPU-bound video and emotion work.
+
+    submit() is awaited from the event loop; the heavy lifting runs in
+    separate processes so decoding and inference never block other requests.
+    """
+
+    def __init__(self, workers=VIDEO_POOL_WORKERS, max_pending=VIDEO_POOL_MAX_PENDING, timeout=VIDEO_TASK_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.executor = None
+        self.generation = 0  # bumped on every (re)start, so a crash is only handled once
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.executor is not None:
+            return
+        self.generation += 1
+        if self.workers <= 0:
+            self.executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+            return
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),  # never fork a process holding model/thread state
+            initializer=_init_worker,
+        )
+        # Spawn every worker now so models are warm before the first request
+        for _ in range(self.workers):
+            self.executor.submit(_ping)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _restart(self, generation):
+        # Every task on a crashed pool sees BrokenProcessPool; only the first one restarts it
+        with self._lock:
+            if self.generation != generation:
+                return
+            self.shutdown()
+            self.start()
+
+    def _task_done(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    async def submit(self, fn, *args, timeout=None):
+        """Run fn(*args) in a worker process and return its result."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise PoolBusyError(f"Video analysis queue is full ({self.max_pending} tasks pending).")
+            self.pending += 1
+            executor, generation = self.executor, self.generation
+
+        try:
+            if executor is None:
+                raise PoolUnavailableError("Video worker pool is not running.")
+            task = executor.submit(_run_task, fn, args, time.time(), self.workers > 0)
+        except BrokenProcessPool as e:
+            self._task_done(None)
+            self._restart(generation)
+            raise PoolUnavailableError(f"Video worker crashed and was restarted: {e}")
+        except BaseException:
+            self._task_done(None)
+            raise
+
+        # The slot is released when the task really finishes, not when the caller stops waiting
+        task.add_done_callback(self._task_done)
+        try:
+            result, metrics = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(task)), timeout or self.timeout)
+            if metrics:
+                instrumentation.registry.merge(metrics)
+            return result
+        except asyncio.TimeoutError:
+            task.cancel()  # drops the task if it is still queued
+            raise
+        except BrokenProcessPool as e:
+            self._restart(generation)
+            raise PoolUnavailableError(f"Video worker crashed and was restarted: {e}")
+
+
+video_pool = VideoWorkerPool()
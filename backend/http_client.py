@@ -0,0 +1,247 @@
+# http_client.py
+#
+# Shared outbound HTTP layer for AssemblyAI, Luxand and any other REST service.
+# Connections are pooled and kept alive per process, requests are bounded per
+# host, and transient failures are retried with jittered exponential backoff.
+
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "10"))
+
+# HTTP/2 needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# A POST is only retried when the server explicitly asked us to come back later
+POST_RETRY_STATUSES = {429, 503}
+# Errors raised before the request reached the server, so any method may retry
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class HttpMetrics:
+    """Per-host request counts, errors, retries, in-flight requests and a latency histogram."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.retries = defaultdict(int)
+        self.in_flight = defaultdict(int)
+        self.latency_sum = defaultdict(float)
+        self.latency_buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def started(self, host):
+        with self._lock:
+            self.in_flight[host] += 1
+
+    def finished(self, host, seconds, error=False):
+        with self._lock:
+            self.in_flight[host] -= 1
+            self.requests[host] += 1
+            self.latency_sum[host] += seconds
+            if error:
+                self.errors[host] += 1
+            buckets = self.latency_buckets[host]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+
+    def retried(self, host):
+        with self._lock:
+            self.retries[host] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                host: {
+                    "requests": self.requests[host],
+                    "errors": self.errors[host],
+                    "retries": self.retries[host],
+                    "in_flight": self.in_flight[host],
+                    "in_flight_limit": HTTP_PER_HOST_LIMIT,
+                    "latency_sum_seconds": round(self.latency_sum[host], 4),
+                    "latency_buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.latency_buckets[host])),
+                }
+                for host in set(self.requests) | set(self.in_flight)
+            }
+
+
+metrics = HttpMetrics()
+
+
+def _client_options():
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        "http2": HTTP2_AVAILABLE,
+    }
+
+
+def _should_retry(method, attempt, retries, response=None, error=None):
+    if attempt >= retries:
+        return False
+    if error is not None:
+        return isinstance(error, CONNECT_ERRORS) or (
+            method in IDEMPOTENT_METHODS and isinstance(error, httpx.TransportError)
+        )
+    statuses = RETRY_STATUSES if method in IDEMPOTENT_METHODS else POST_RETRY_STATUSES
+    return response.status_code in statuses
+
+
+def _backoff(attempt, response=None):
+    """Full-jitter exponential backoff, honouring Retry-After when the server sends one."""
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), HTTP_BACKOFF_MAX)
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+
+
+# --- Async API ---
+
+_async_client = None
+_async_loop = None
+_async_host_limits = {}
+
+def _get_async_client():
+    # An httpx.AsyncClient is bound to the event loop that created it
+    global _async_client, _async_loop, _async_host_limits
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_loop is not loop:
+        _async_client = httpx.AsyncClient(**_client_options())
+        _async_loop = loop
+        _async_host_limits = {}
+    return _async_client
+
+def _async_host_limit(host):
+    if host not in _async_host_limits:
+        _async_host_limits[host] = asyncio.Semaphore(HTTP_PER_HOST_LIMIT)
+    return _async_host_limits[host]
+
+
+async def request(method, url, *, retries=None, **kwargs) -> httpx.Response:
+    """
+    Send a request through the shared async client.
+
+    Retries connection failures, and retryable status codes (5xx/429 for
+    idempotent methods, 429/503 for POST), with jittered backoff. Streamed
+    bodies can't be replayed, so pass retries=0 for them.
+    """
+    method = method.upper()
+    retries = HTTP_RETRIES if retries is None else retries
+    client = _get_async_client()
+    host = urlsplit(url).netloc
+
+    attempt = 0
+    while True:
+        response, error = None, None
+        async with _async_host_limit(host):
+            metrics.started(host)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                metrics.finished(host, time.perf_counter() - started,
+                                 error=error is not None or (response is not None and response.status_code >= 500))
+
+        if not _should_retry(method, attempt, retries, response, error):
+            if error is not None:
+                raise error
+            return response
+
+        metrics.retried(host)
+        await asyncio.sleep(_backoff(attempt, response))
+        attempt += 1
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+# --- Sync shim for code that is not async yet ---
+
+_sync_client = None
+_sync_lock = threading.Lock()
+_sync_host_limits = defaultdict(lambda: threading.BoundedSemaphore(HTTP_PER_HOST_LIMIT))
+
+def _get_sync_client():
+    global _sync_client
+    if _sync_client is None:
+        with _sync_lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(**_client_options())
+    return _sync_client
+
+
+def request_sync(method, url, *, retries=None, **kwargs) -> httpx.Response:
+    """Blocking counterpart of request(), sharing the same pooling, limits and retry policy."""
+    method = method.upper()
+    retries = HTTP_RETRIES if retries is None else retries
+    client = _get_sync_client()
+    host = urlsplit(url).netloc
+    with _sync_lock:
+        host_limit = _sync_host_limits[host]
+
+    attempt = 0
+    while True:
+        response, error = None, None
+        with host_limit:
+            metrics.started(host)
+            started = time.perf_counter()
+            try:
+                response = client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = e
+            finally:
+                metrics.finished(host, time.perf_counter() - started,
+                                 error=error is not None or (response is not None and response.status_code >= 500))
+
+        if not _should_retry(method, attempt, retries, response, error):
+            if error is not None:
+                raise error
+            return response
+
+        metrics.retried(host)
+        time.sleep(_backoff(attempt, response))
+        attempt += 1
+
+
+def close():
+    global _sync_client
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
@@ -0,0 +1,234 @@
+# instrumentation.py
+#
+# Timing spans, latency histograms, in-flight gauges and error counts per
+# pipeline stage (web search, Gemini calls, AssemblyAI, embeddings, vector
+# queries, frame decode, model inference), rendered in Prometheus text format
+# for /metrics. Also carries the current request and session IDs in context
+# variables so log lines can be tied back to a request (LOG_FORMAT=json).
+
+import os
+import sys
+import json
+import time
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# "text" keeps the existing print-style output; "json" writes one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+request_id = contextvars.ContextVar("request_id", default=None)
+session_id = contextvars.ContextVar("session_id", default=None)
+
+
+def _labels_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+class Registry:
+    """Histograms, error counts and in-flight gauges per (stage, labels), plus plain counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.sums = defaultdict(float)
+        self.errors = defaultdict(int)
+        self.in_flight = defaultdict(int)
+        self.counters = defaultdict(float)  # (name, labels) -> value
+
+    def started(self, key):
+        with self._lock:
+            self.in_flight[key] += 1
+
+    def finished(self, key, seconds, error=False):
+        with self._lock:
+            self.in_flight[key] -= 1
+        self.observe(key, seconds, error)
+
+    def observe(self, key, seconds, error=False):
+        with self._lock:
+            buckets = self.buckets[key]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            self.sums[key] += seconds
+            if error:
+                self.errors[key] += 1
+
+    def add(self, name, value, labels):
+        with self._lock:
+            self.counters[(name, labels)] += value
+
+    def drain(self):
+        """Return everything recorded so far and reset, so a worker process can hand it to the API process."""
+        with self._lock:
+            snapshot = {
+                "buckets": dict(self.buckets), "sums": dict(self.sums),
+                "errors": dict(self.errors), "counters": dict(self.counters),
+            }
+            self.buckets.clear()
+            self.sums.clear()
+            self.errors.clear()
+            self.counters.clear()
+        return snapshot
+
+    def merge(self, snapshot):
+        with self._lock:
+            for key, buckets in snapshot["buckets"].items():
+                self.buckets[key] = [a + b for a, b in zip(self.buckets[key], buckets)]
+            for key, value in snapshot["sums"].items():
+                self.sums[key] += value
+            for key, value in snapshot["errors"].items():
+                self.errors[key] += value
+            for key, value in snapshot["counters"].items():
+                self.counters[key] += value
+
+    def samples(self):
+        with self._lock:
+            return (
+                {key: list(value) for key, value in self.buckets.items()}, dict(self.sums),
+                dict(self.errors), dict(self.in_flight), dict(self.counters),
+            )
+
+
+registry = Registry()
+_collectors = []
+
+
+@contextmanager
+def span(stage, **labels):
+    """
+    Time a block as one observation of stage; an exception counts as an error
+    and is re-raised. GeneratorExit (a consumer closing a stream early, e.g. a
+    client disconnect) is not an error.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    key = (stage, _labels_key(labels))
+    registry.started(key)
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except GeneratorExit:
+        raise
+    except BaseException:
+        error = True
+        raise
+    finally:
+        registry.finished(key, time.perf_counter() - started, error)
+
+
+def observe(stage, seconds, error=False, **labels):
+    """Record a duration measured elsewhere, e.g. time spent waiting in a queue."""
+    if METRICS_ENABLED:
+        registry.observe((stage, _labels_key(labels)), seconds, error)
+
+
+def count(name, value=1, **labels):
+    """Add to a counter, e.g. tokens sent to a model. Exported as <name>_total."""
+    if METRICS_ENABLED and value:
+        registry.add(name, value, _labels_key(labels))
+
+
+def register_collector(collector):
+    """
+    collector() returns (name, labels, value) samples read at scrape time,
+    e.g. another module's stats. They are exported as gauges.
+    """
+    _collectors.append(collector)
+
+
+# --- Prometheus text format ---
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels) + "}"
+
+
+def _metric_name(name):
+    return "".join(char if char.isalnum() or char == "_" else "_" for char in name)
+
+
+def render_prometheus():
+    buckets, sums, errors, in_flight, counters = registry.samples()
+    lines = []
+
+    lines.append("# HELP stage_duration_seconds Time spent per pipeline stage.")
+    lines.append("# TYPE stage_duration_seconds histogram")
+    for (stage, labels), counts in sorted(buckets.items()):
+        base = (("stage", stage),) + labels
+        cumulative = 0
+        for bound, bucket_count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], counts):
+            cumulative += bucket_count
+            lines.append(f"stage_duration_seconds_bucket{_format_labels(base + (('le', bound),))} {cumulative}")
+        lines.append(f"stage_duration_seconds_sum{_format_labels(base)} {sums.get((stage, labels), 0.0):.6f}")
+        lines.append(f"stage_duration_seconds_count{_format_labels(base)} {cumulative}")
+
+    lines.append("# HELP stage_errors_total Failed calls per pipeline stage.")
+    lines.append("# TYPE stage_errors_total counter")
+    for (stage, labels) in sorted(buckets):
+        lines.append(f"stage_errors_total{_format_labels((('stage', stage),) + labels)} {errors.get((stage, labels), 0)}")
+
+    lines.append("# HELP stage_in_flight Calls currently running per pipeline stage.")
+    lines.append("# TYPE stage_in_flight gauge")
+    for (stage, labels), value in sorted(in_flight.items()):
+        lines.append(f"stage_in_flight{_format_labels((('stage', stage),) + labels)} {value}")
+
+    by_name = defaultdict(list)
+    for (name, labels), value in counters.items():
+        by_name[name].append((labels, value))
+    for name, samples in sorted(by_name.items()):
+        metric = f"{_metric_name(name)}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{_format_labels(labels)} {value:g}" for labels, value in sorted(samples))
+
+    # Samples of one metric must be contiguous under its TYPE line, so group them by name first
+    collected = defaultdict(list)
+    for collector in _collectors:
+        try:
+            for name, labels, value in collector():
+                collected[_metric_name(name)].append(f"{_format_labels(_labels_key(labels))} {value:g}")
+        except Exception as e:
+            log(f"❌ Metrics collector {getattr(collector, '__name__', collector)} failed: {e}", level="error")
+    for name, samples in collected.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{sample}" for sample in samples)
+
+    return "\n".join(lines) + "\n"
+
+
+# --- Logging ---
+
+def log(message, level="info", **fields):
+    """
+    Print a log line. With LOG_FORMAT=json it is a JSON object carrying the
+    current request and session IDs and any extra fields.
+    """
+    if LOG_FORMAT != "json":
+        print(message)
+        return
+    record = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "level": level,
+        "message": message,
+        "request_id": request_id.get(),
+        "session_id": session_id.get(),
+        **fields,
+    }
+    sys.stdout.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
@@ -0,0 +1,286 @@
+# llm_cache.py
+#
+# Content-addressed cache in front of Gemini generate_content calls. Identical
+# (model, system instruction, prompt, generation config, schema) inputs are
+# answered from the cache without a network round trip, whether they were
+# requested whole (generate_text) or streamed (stream_text).
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import google.generativeai as genai
+from google.generativeai.types import GenerationConfig
+
+import instrumentation
+
+# "memory" (in-process LRU), "sqlite" (on disk, shared by workers on one host) or "off"
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+
+
+class EmptyResponseError(Exception):
+    """Gemini returned no usable candidate."""
+
+
+class MemoryCache:
+    """In-process LRU cache with a TTL, evicting least recently used entries past max_bytes."""
+
+    def __init__(self, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.time() + self.ttl, value)
+            self.size += len(value.encode())
+            while self.size > self.max_bytes and self.entries:
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, value = self.entries.pop(key)
+        self.size -= len(value.encode())
+
+    def stats(self):
+        return {"backend": "memory", "hits": self.hits, "misses": self.misses,
+                "entries": len(self.entries), "bytes": self.size}
+
+
+class SQLiteCache:
+    """On-disk cache with a TTL, evicting least recently used entries past max_bytes."""
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+        self.conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode()), now + self.ttl, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def _evict(self):
+        self.conn.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM cache ORDER BY last_access").fetchall():
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {"backend": "sqlite", "hits": self.hits, "misses": self.misses,
+                "entries": entries, "bytes": size}
+
+
+def _create_cache():
+    if LLM_CACHE_BACKEND == "sqlite":
+        return SQLiteCache()
+    if LLM_CACHE_BACKEND == "memory":
+        return MemoryCache()
+    return None
+
+cache = _create_cache()
+
+
+def cache_key(model_name, system_instruction, prompt, generation_config=None, response_schema=None):
+    """Stable hash of everything that determines a Gemini response."""
+    payload = json.dumps(
+        [model_name, system_instruction, prompt, generation_config, response_schema],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _count_tokens(model_name, usage):
+    if usage is None:
+        return
+    instrumentation.count("llm_tokens", getattr(usage, "prompt_token_count", 0) or 0, model=model_name, kind="prompt")
+    instrumentation.count("llm_tokens", getattr(usage, "candidates_token_count", 0) or 0, model=model_name, kind="response")
+
+
+def _cached(key, validate):
+    """The cached text for key, or None; an entry that no longer passes validate is evicted."""
+    text = cache.get(key)
+    if text is not None and validate is not None:
+        try:
+            validate(text)
+        except Exception:
+            cache.delete(key)
+            return None
+    return text
+
+
+def _finished(candidate):
+    # Only complete responses are cached; MAX_TOKENS, SAFETY etc. leave truncated or empty text
+    reason = candidate.finish_reason
+    return getattr(reason, "name", str(reason)) == "STOP"
+
+
+def generate_text(model_name, prompt, system_instruction=None, generation_config=None,
+                  response_schema=None, use_cache=True, validate=None):
+    """
+    Return the text of a Gemini response, served from the cache when possible.
+
+    generation_config is a plain dict of GenerationConfig fields so it can be
+    hashed; response_schema is passed separately for the same reason.
+    Pass use_cache=False for call sites that must always hit the model.
+
+    validate, if given, is called with the text and should raise when it is
+    unusable (e.g. JSON that doesn't parse). A response is only cached once it
+    has finished normally and passed validate, so a bad response is never
+    replayed from the cache; the validation error is raised to the caller.
+    """
+    key = cache_key(model_name, system_instruction, prompt, generation_config, response_schema)
+    if use_cache and cache is not None:
+        cached = _cached(key, validate)
+        if cached is not None:
+            return cached
+
+    model = genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+    config = None
+    if generation_config or response_schema:
+        config = GenerationConfig(**(generation_config or {}), response_schema=response_schema)
+
+    with instrumentation.span("gemini", model=model_name):
+        response = model.generate_content(contents=prompt, generation_config=config)
+    _count_tokens(model_name, getattr(response, "usage_metadata", None))
+
+    candidates = response.candidates
+    if not candidates or not candidates[0].content.parts:
+        finish_reason = candidates[0].finish_reason if candidates else 'No candidates'
+        raise EmptyResponseError(f"No valid response. Finish reason: {finish_reason}")
+
+    text = candidates[0].content.parts[0].text
+    if validate is not None:
+        validate(text)
+    if use_cache and cache is not None and _finished(candidates[0]):
+        cache.set(key, text)
+    return text
+
+
+def stream_text(model_name, prompt, system_instruction=None, generation_config=None,
+                response_schema=None, use_cache=True, validate=None):
+    """
+    Yield the text of a Gemini response piece by piece as it is generated.
+
+    A cached response is yielded in one piece. A stream that finished
+    normally and passed validate (see generate_text) is cached under the
+    same key generate_text uses; a validation error is raised after the
+    last piece.
+    """
+    key = cache_key(model_name, system_instruction, prompt, generation_config, response_schema)
+    if use_cache and cache is not None:
+        cached = _cached(key, validate)
+        if cached is not None:
+            yield cached
+            return
+
+    model = genai.GenerativeModel(model_name=model_name, system_instruction=system_instruction)
+    config = None
+    if generation_config or response_schema:
+        config = GenerationConfig(**(generation_config or {}), response_schema=response_schema)
+
+    pieces = []
+    usage = None
+    last_candidate = None
+    # The span covers the whole stream, including time the consumer spends between pieces
+    with instrumentation.span("gemini_stream", model=model_name):
+        for chunk in model.generate_content(contents=prompt, generation_config=config, stream=True):
+            # The final chunk carries the token counts for the whole response
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            for candidate in chunk.candidates[:1]:
+                # The final chunk's candidate carries the finish reason
+                last_candidate = candidate
+                for part in candidate.content.parts:
+                    if part.text:
+                        pieces.append(part.text)
+                        yield part.text
+    _count_tokens(model_name, usage)
+
+    if not pieces:
+        raise EmptyResponseError("No valid response. Stream ended without text")
+
+    text = "".join(pieces)
+    if validate is not None:
+        validate(text)
+    if use_cache and cache is not None and _finished(last_candidate):
+        cache.set(key, text)
+
+
+def cache_stats():
+    return cache.stats() if cache is not None else {"backend": "off"}
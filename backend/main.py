@@ -1,25 +1,179 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, WebSocket, Depends, Header, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional
-from AudioAnalyser.services.audio_transcript import upload_to_assemblyai, transcribe_and_poll
-from AudioAnalyser.services.evaluation import analyze_technical_answer
-from VideoAnalyser.video_processing import process_video
-from ReportGeneration.connection import generate_interview_report   # ✅ NEW IMPORT
-import shared_state
-from QuestionGeneration.context_generation import generate_interview_questions
-from datetime import datetime
+from AudioAnalyser.services.transcription_jobs import submit_job, get_job, job_events, notify_transcript_ready
+from VideoAnalyser.video_processing import process_video, analyze_images
+from VideoAnalyser.live_session import EmotionAggregator
+from VideoAnalyser.model_registry import warm_up as warm_up_emotion_model
+from VideoAnalyser.worker_pool import video_pool, PoolBusyError, PoolUnavailableError
+from ReportGeneration.connection import generate_interview_report, stream_interview_report   # ✅ NEW IMPORT
+from ReportGeneration.Query import query_cache
+from ReportGeneration.Retriever import pgvector_store
+import session_store
+import http_client
+import instrumentation
+import llm_cache
+from QuestionGeneration import search_context
+from QuestionGeneration.question_bank import get_question_bank, CATEGORY_PLAN
+from collections import deque
+import asyncio
+import json
+import hashlib
+import time
+import uuid
+import os
 
 app = FastAPI()
 
+# Live video: frames scored per model call, seconds to wait for a batch to fill,
+# and frames buffered per connection before the oldest are dropped
+LIVE_BATCH_SIZE = int(os.getenv("LIVE_VIDEO_BATCH_SIZE", "8"))
+LIVE_BATCH_WINDOW = float(os.getenv("LIVE_VIDEO_BATCH_WINDOW", "0.5"))
+LIVE_MAX_BACKLOG = int(os.getenv("LIVE_VIDEO_MAX_BACKLOG", "32"))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
 
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    # Request and session IDs ride along in context variables, so logs and background work can carry them
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    instrumentation.request_id.set(request_id)
+    instrumentation.session_id.set(request.headers.get("x-session-id") or request.query_params.get("session_id"))
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        # Label by route template, not the raw path, so job IDs don't explode the label set
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        seconds = time.perf_counter() - started
+        instrumentation.observe("http_request", seconds, error=status >= 500, method=request.method, route=path)
+        if instrumentation.LOG_FORMAT == "json" and path != "/metrics":
+            instrumentation.log(f"{request.method} {request.url.path} {status}", method=request.method,
+                                route=path, status=status, duration_ms=round(seconds * 1000, 1))
+
+def collect_dependency_metrics():
+    """Outbound HTTP, LLM cache and video pool figures, read when /metrics is scraped."""
+    for host, stats in http_client.metrics.snapshot().items():
+        labels = {"host": host}
+        yield "http_client_requests_total", labels, stats["requests"]
+        yield "http_client_errors_total", labels, stats["errors"]
+        yield "http_client_retries_total", labels, stats["retries"]
+        yield "http_client_in_flight", labels, stats["in_flight"]
+        yield "http_client_latency_seconds_sum", labels, stats["latency_sum_seconds"]
+        cumulative = 0
+        for bound, count in stats["latency_buckets"].items():
+            cumulative += count
+            yield "http_client_latency_seconds_bucket", {**labels, "le": bound}, cumulative
+        yield "http_client_latency_seconds_count", labels, cumulative
+    for name, value in llm_cache.cache_stats().items():
+        if isinstance(value, (int, float)):
+            yield f"llm_cache_{name}", {}, value
+    yield "video_pool_pending", {}, video_pool.pending
+    yield "video_pool_max_pending", {}, video_pool.max_pending
+
+instrumentation.register_collector(collect_dependency_metrics)
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(instrumentation.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def load_models():
+    # Video work runs in the worker pool; each worker warms its own model.
+    # Without worker processes, load the model here so the first frame doesn't pay for it.
+    video_pool.start()
+    if video_pool.workers <= 0 and os.getenv("EMOTION_MODEL_WARMUP", "true").lower() == "true":
+        try:
+            warm_up_emotion_model()
+        except Exception as e:
+            instrumentation.log(f"❌ Emotion model warm-up failed: {e}", level="error")
+
+async def refresh_report_queries():
+    # Precompute the report's RAG query once, then keep it fresh on a schedule
+    try:
+        await asyncio.to_thread(query_cache.warm)
+    except Exception as e:
+        instrumentation.log(f"❌ Report query warm-up failed: {e}", level="error")
+    while True:
+        await asyncio.sleep(min(query_cache.QUERY_CACHE_REFRESH, 3600))
+        try:
+            await asyncio.to_thread(query_cache.refresh_stale)
+        except Exception as e:
+            instrumentation.log(f"❌ Report query refresh failed: {e}", level="error")
+
+background_tasks = set()
+
+def run_in_background(coro):
+    # Keep a reference so the task isn't garbage-collected before it finishes
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+@app.on_event("startup")
+async def start_background_tasks():
+    run_in_background(refresh_report_queries())
+
+@app.on_event("shutdown")
+async def stop_workers():
+    for task in list(background_tasks):
+        task.cancel()
+    video_pool.shutdown()
+    await http_client.aclose()
+    http_client.close()
+    pgvector_store.close_pool()
+    await pgvector_store.close_async_pool()
+
+def get_session_id(x_session_id: Optional[str] = Header(None),
+                   session_id: Optional[str] = Query(None)) -> str:
+    # Header for fetch calls; query parameter for EventSource and WebSocket, which can't set headers
+    session_id = x_session_id or session_id
+    if not session_store.is_valid_session_id(session_id):
+        raise HTTPException(status_code=400, detail="❌ Missing or invalid session ID. Save job info first.")
+    return session_id
+
+def add_video_results(session_id, results):
+    # Fold the new frames into the session's aggregate in one atomic store update,
+    # so concurrent uploads on any worker don't lose each other's frames
+    def fold(state):
+        aggregator = EmotionAggregator.from_dict(state)
+        aggregator.add(results)
+        return aggregator.to_dict()
+    return EmotionAggregator.from_dict(session_store.update(session_id, "video_analysis", fold))
+
+def report_session(session_id):
+    """
+    Return (session, fingerprint, cached_report) for the report endpoints.
+
+    The fingerprint hashes the stored session data, so a saved report is
+    reused until the interview adds something new.
+    """
+    session = session_store.get_session(session_id)
+    saved = session.pop("report", None)
+    fingerprint = hashlib.sha256(json.dumps(session, sort_keys=True).encode()).hexdigest()
+    # The report sees the emotion summary, not the aggregator's internal state
+    session["video_analysis"] = EmotionAggregator.from_dict(session["video_analysis"]).summary()
+    cached = saved["report"] if saved and saved.get("fingerprint") == fingerprint else None
+    return session, fingerprint, cached
+
+def save_report(session_id, fingerprint, report):
+    session_store.save(session_id, "report", {"fingerprint": fingerprint, "report": report})
+
 class JobInfo(BaseModel):
     candidate_name: str
     job_role: str
@@ -28,76 +182,213 @@ class JobInfo(BaseModel):
     other_details: Optional[str] = None
 
 @app.post("/save-job-info")
-async def save_job_info(job_info: JobInfo):
-    shared_state.stored_job_info = job_info.dict()
-    return {"message": "✅ Job details saved", "data": shared_state.stored_job_info}
+async def save_job_info(job_info: JobInfo, x_session_id: Optional[str] = Header(None)):
+    # Starts a new session unless the client sends one it already has
+    session_id = x_session_id if session_store.is_valid_session_id(x_session_id) else session_store.new_session_id()
+    session_store.save(session_id, "job_info", job_info.dict())
+    instrumentation.session_id.set(session_id)  # for logs from the prefetches below
+    # Start the web search now so it is warm by the time questions are requested
+    search_context.prefetch(job_info.job_role, job_info.company_name)
+    # ...and top up the question bank for this role/company if it is running low
+    run_in_background(asyncio.to_thread(get_question_bank().prefetch, job_info.dict()))
+    if query_cache.QUERY_CACHE_PER_ROLE:
+        # Warm the role-specific report query while the interview runs
+        run_in_background(asyncio.to_thread(query_cache.get_report_query, job_info.job_role))
+    return {"message": "✅ Job details saved", "session_id": session_id, "data": job_info.dict()}
 
 @app.get("/get-job-info")
-async def get_job_info():
-    if shared_state.stored_job_info:
-        return {"job_info": shared_state.stored_job_info}
+async def get_job_info(session_id: str = Depends(get_session_id)):
+    job_info = session_store.get_section(session_id, "job_info")
+    if job_info:
+        return {"job_info": job_info}
     else:
         return {"message": "❌ No job info saved yet."}
 
 @app.get("/generate-problems")
-async def generate_problems_endpoint():
-    details = shared_state.stored_job_info
-    questions = generate_interview_questions(details)
-    shared_state.questions_generated = questions
+async def generate_problems_endpoint(category: str = "mixed", session_id: str = Depends(get_session_id)):
+    # Served from the pre-generated question bank; a session never gets the same question twice
+    if category not in CATEGORY_PLAN:
+        return JSONResponse(status_code=400, content={"error": f"❌ Unknown category. Use {', '.join(CATEGORY_PLAN)}."})
+    details = session_store.get_section(session_id, "job_info")
+    questions = await asyncio.to_thread(get_question_bank().serve, session_id, details, category)
+    session_store.save(session_id, "questions", questions)
     return questions
 
 @app.post("/upload")
-async def upload_audio(audio: UploadFile = File(...)):
+async def upload_audio(audio: UploadFile = File(...), session_id: str = Depends(get_session_id)):
+    """Start transcription + evaluation in the background and return a job ID right away."""
     try:
-        audio_url = upload_to_assemblyai(audio.file)
-        transcript_text = transcribe_and_poll(audio_url)
-        analysis_result = analyze_technical_answer(transcript_text)
-
-        # Generate timestamp key
-        timestamp = datetime.utcnow().isoformat()
-
-        # Save transcript & analysis under a new timestamp entry (no overwrite)
-        shared_state.stored_audio_transcripts[timestamp] = {
-            "transcription": transcript_text,
-            "analysis": analysis_result
-        }
-
+        audio_bytes = await audio.read()
+        job = submit_job(audio_bytes, session_id)
         return {
-            "timestamp": timestamp,
-            "transcription": transcript_text,
-            "analysis": analysis_result,
-            "job_info_used": shared_state.stored_job_info
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "timestamp": job["timestamp"],
+            "job_info_used": session_store.get_section(session_id, "job_info")
         }
 
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/upload/{job_id}")
+async def upload_status(job_id: str, session_id: str = Depends(get_session_id)):
+    job = get_job(job_id)
+    if job is None or job["session_id"] != session_id:
+        return JSONResponse(status_code=404, content={"error": "❌ Unknown job ID."})
+    return job
+
+@app.get("/upload/{job_id}/events")
+async def upload_events(job_id: str, session_id: str = Depends(get_session_id)):
+    """Server-sent events: one message per status change until the job finishes."""
+    job = get_job(job_id)
+    if job is None or job["session_id"] != session_id:
+        return JSONResponse(status_code=404, content={"error": "❌ Unknown job ID."})
+
+    async def event_stream():
+        async for job in job_events(job_id):
+            yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+@app.post("/assemblyai-webhook")
+async def assemblyai_webhook(payload: dict):
+    # AssemblyAI posts {"transcript_id": ..., "status": ...} when a transcript finishes
+    notify_transcript_ready(payload.get("transcript_id"))
+    return {"received": True}
+
 @app.post("/analyze-video")
-async def analyze_video(video: UploadFile = File(...)):
+async def analyze_video(video: UploadFile = File(...), session_id: str = Depends(get_session_id)):
     try:
         video_bytes = await video.read()
-        analysis_result = process_video(video_bytes)
+        analysis_result = await video_pool.submit(process_video, video_bytes)
+
+        emotions = analysis_result.get("emotion_analysis") or []
+        await asyncio.to_thread(add_video_results, session_id, emotions)
 
+        latest = [result["emotion"] for result in emotions if "emotion" in result]
         return {
             "message": "✅ Video processed successfully",
             "total_frames": analysis_result.get("total_frames"),
             "frames_analyzed": analysis_result.get("frames_analyzed"),
-            "emotions": analysis_result.get("emotion_analysis"),
+            "emotion": latest[-1] if latest else None,
+            "emotions": emotions,
         }
 
+    except PoolBusyError as e:
+        return JSONResponse(status_code=429, content={"error": str(e)})
+    except PoolUnavailableError as e:
+        return JSONResponse(status_code=503, content={"error": str(e)})
+    except asyncio.TimeoutError:
+        return JSONResponse(status_code=504, content={"error": "Video analysis timed out."})
     except Exception as e:
         return {"error": str(e)}
 
+@app.websocket("/ws/analyze-video")
+async def analyze_video_stream(websocket: WebSocket):
+    """
+    Live emotion analysis: the client sends encoded frames as binary messages,
+    the server scores them in batches and pushes results back as JSON.
+    """
+    session_id = websocket.query_params.get("session_id")
+    if not session_store.is_valid_session_id(session_id):
+        await websocket.close(code=1008, reason="Missing or invalid session ID")
+        return
+
+    instrumentation.session_id.set(session_id)
+    await websocket.accept()
+    backlog = deque(maxlen=LIVE_MAX_BACKLOG)  # oldest frames are dropped if scoring falls behind
+    frame_ready = asyncio.Event()
+    closed = False
+
+    async def receive_frames():
+        nonlocal closed
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    backlog.append(message["bytes"])
+                    frame_ready.set()
+        finally:
+            closed = True
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            await frame_ready.wait()
+            if closed and not backlog:
+                break
+
+            # Give the client a short window to fill the batch
+            if len(backlog) < LIVE_BATCH_SIZE and not closed:
+                await asyncio.sleep(LIVE_BATCH_WINDOW)
+            frames = [backlog.popleft() for _ in range(min(len(backlog), LIVE_BATCH_SIZE))]
+            if not backlog:
+                frame_ready.clear()
+
+            try:
+                results = await video_pool.submit(analyze_images, frames)
+            except (PoolBusyError, PoolUnavailableError, asyncio.TimeoutError) as e:
+                if not closed:
+                    await websocket.send_json({"type": "busy", "error": str(e) or "Video analysis timed out."})
+                continue
+
+            aggregator = await asyncio.to_thread(add_video_results, session_id, results)
+            if not closed:
+                await websocket.send_json({
+                    "type": "emotions",
+                    "results": results,
+                    "dominant_emotion": aggregator.dominant_emotion(),
+                })
+    except Exception as e:
+        instrumentation.log(f"❌ Live video stream closed: {e}", level="error")
+    finally:
+        receiver.cancel()
+
 # ✅ NEW: Generate final report endpoint
 @app.post("/generate-report")
-async def generate_report():
+async def generate_report(session_id: str = Depends(get_session_id)):
     try:
-        report = generate_interview_report()
-        print(report)
+        session, fingerprint, report = await asyncio.to_thread(report_session, session_id)
+        cached = report is not None
+        if report is None:
+            report = await asyncio.to_thread(generate_interview_report, session)
+            if report:
+                await asyncio.to_thread(save_report, session_id, fingerprint, report)
         if report:
+            instrumentation.log("✅ Report generated", fields=len(report), cached=cached)
             return {"message": "✅ Report generated successfully", "report": report}
         else:
             return {"message": "❌ Failed to generate report"}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/generate-report/stream")
+async def generate_report_stream(session_id: str = Depends(get_session_id)):
+    """
+    Server-sent events: a "field" message as each report field is generated,
+    then the validated "report" (or an "error").
+    """
+    session, fingerprint, cached = await asyncio.to_thread(report_session, session_id)
+
+    # Starlette iterates a plain generator in its threadpool, so generation and saving stay off the event loop
+    def events():
+        if cached is not None:
+            for name, value in cached.items():
+                yield "field", {"name": name, "value": value}
+            yield "report", cached
+            return
+        for event, data in stream_interview_report(session):
+            if event == "report":
+                save_report(session_id, fingerprint, data)
+            yield event, data
+
+    def event_stream():
+        # Sent right away so the page can show progress before the first field
+        yield f"event: status\ndata: {json.dumps({'status': 'generating'})}\n\n"
+        for event, data in events():
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
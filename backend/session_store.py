@@ -0,0 +1,259 @@
+# session_store.py
+#
+# Per-session interview state (job info, questions, transcripts, video
+# analysis), keyed by a session ID the client sends with every request.
+# Each session is a small hash of JSON fields, so concurrent writers touching
+# different fields never overwrite each other, and any worker behind a load
+# balancer can serve any session when the store is shared (SQLite on one host,
+# Redis across hosts). Read-modify-write of one field (update) is atomic in
+# the store itself, and background job records live here too.
+
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# "memory" (single process), "sqlite" (workers on one host) or "redis" (any Redis-compatible server)
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "memory")
+# Idle seconds before a session expires; every write extends it
+SESSION_TTL = float(os.getenv("SESSION_TTL", "86400"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(1024 * 1024)))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))  # memory backend only
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "sessions.sqlite3")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_KEY_PREFIX = "session:"
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+# Job records are stored under their own keys; ":" can't appear in a client session ID
+JOB_KEY_PREFIX = "job:"
+
+# Sections of a session record; audio transcripts are one field per recording
+SECTIONS = ("job_info", "questions", "audio_transcripts", "video_analysis")
+
+
+class SessionTooLargeError(ValueError):
+    """Writing the field would push the session past SESSION_MAX_BYTES."""
+
+
+class MemorySessionStore:
+    """In-process store with sliding TTL, evicting least recently used sessions past max_sessions."""
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()  # session_id -> (expires_at, {field: value})
+        self._lock = threading.Lock()
+
+    def get_all(self, session_id):
+        with self._lock:
+            entry = self.sessions.get(session_id)
+            if entry is None or entry[0] < time.time():
+                self.sessions.pop(session_id, None)
+                return {}
+            self.sessions.move_to_end(session_id)
+            return dict(entry[1])
+
+    def set_field(self, session_id, field, value):
+        self.update_field(session_id, field, lambda _: value)
+
+    def update_field(self, session_id, field, fn):
+        with self._lock:
+            entry = self.sessions.pop(session_id, None)
+            fields = entry[1] if entry and entry[0] >= time.time() else {}
+            try:
+                value = fn(fields.get(field))
+                _check_size(fields, field, value)
+                fields[field] = value
+            finally:
+                self.sessions[session_id] = (time.time() + self.ttl, fields)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return value
+
+    def delete(self, session_id):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """On-disk store shared by workers on one host; expired sessions are purged on write."""
+
+    def __init__(self, path=SESSION_STORE_PATH, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_fields (
+                session_id TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (session_id, field)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS session_fields_expires ON session_fields (expires_at)")
+        self.conn.commit()
+
+    def get_all(self, session_id):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT field, value FROM session_fields WHERE session_id = ? AND expires_at >= ?",
+                (session_id, time.time()),
+            ).fetchall()
+        return dict(rows)
+
+    def set_field(self, session_id, field, value):
+        self.update_field(session_id, field, lambda _: value)
+
+    def update_field(self, session_id, field, fn):
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the database write lock up front, so the read, fn and the write
+            # are atomic across workers, and the size check sees their writes
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                fields = dict(self.conn.execute(
+                    "SELECT field, value FROM session_fields WHERE session_id = ? AND expires_at >= ?",
+                    (session_id, now),
+                ).fetchall())
+                value = fn(fields.get(field))
+                _check_size(fields, field, value)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO session_fields (session_id, field, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (session_id, field, value, now + self.ttl),
+                )
+                # Sliding expiry applies to the whole session
+                self.conn.execute("UPDATE session_fields SET expires_at = ? WHERE session_id = ?",
+                                  (now + self.ttl, session_id))
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self.conn.execute("DELETE FROM session_fields WHERE expires_at < ?", (now,))
+                self.conn.commit()
+                return value
+            except Exception:
+                self.conn.rollback()
+                raise
+
+    def delete(self, session_id):
+        with self._lock:
+            self.conn.execute("DELETE FROM session_fields WHERE session_id = ?", (session_id,))
+            self.conn.commit()
+
+
+class RedisSessionStore:
+    """One Redis hash per session with a key TTL; works with any Redis-compatible server."""
+
+    def __init__(self, url=REDIS_URL, ttl=SESSION_TTL):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl = int(ttl)
+
+    def _key(self, session_id):
+        return REDIS_KEY_PREFIX + session_id
+
+    def get_all(self, session_id):
+        return self.client.hgetall(self._key(session_id))
+
+    def set_field(self, session_id, field, value):
+        self.update_field(session_id, field, lambda _: value)
+
+    def update_field(self, session_id, field, fn):
+        key = self._key(session_id)
+
+        # WATCH/MULTI: redis-py re-runs this if another client writes the session in between
+        def transaction(pipe):
+            fields = pipe.hgetall(key)
+            value = fn(fields.get(field))
+            _check_size(fields, field, value)
+            pipe.multi()
+            pipe.hset(key, field, value)
+            pipe.expire(key, self.ttl)
+            return value
+
+        return self.client.transaction(transaction, key, value_from_callable=True)
+
+    def delete(self, session_id):
+        self.client.delete(self._key(session_id))
+
+
+def _check_size(fields, field, value):
+    size = sum(len(v.encode()) for f, v in fields.items() if f != field) + len(value.encode())
+    if size > SESSION_MAX_BYTES:
+        raise SessionTooLargeError(f"❌ Session would exceed {SESSION_MAX_BYTES} bytes.")
+
+
+def _create_store():
+    if SESSION_STORE_BACKEND == "sqlite":
+        return SQLiteSessionStore()
+    if SESSION_STORE_BACKEND == "redis":
+        return RedisSessionStore()
+    if SESSION_STORE_BACKEND == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"❌ Unknown SESSION_STORE_BACKEND '{SESSION_STORE_BACKEND}'. Use memory, sqlite or redis.")
+
+store = _create_store()
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def is_valid_session_id(session_id):
+    return bool(session_id) and bool(SESSION_ID_PATTERN.match(session_id))
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def save(session_id, section, value, entry=None):
+    """Store one section (or one entry of the audio_transcripts section) as compact JSON."""
+    field = section if entry is None else f"{section}:{entry}"
+    store.set_field(session_id, field, _dumps(value))
+
+
+def update(session_id, section, fn):
+    """
+    Replace one section with fn(current value, or None if unset) and return
+    the new value. The read and write are atomic in the store, so concurrent
+    updates from other requests or workers are never lost; fn may be re-run.
+    """
+    def apply(current):
+        return _dumps(fn(json.loads(current) if current is not None else None))
+    return json.loads(store.update_field(session_id, section, apply))
+
+
+def get_session(session_id):
+    """The session's record: {"job_info", "questions", "audio_transcripts", "video_analysis"}."""
+    session = {"job_info": {}, "questions": {}, "audio_transcripts": {}, "video_analysis": {}}
+    for field, value in store.get_all(session_id).items():
+        section, _, entry = field.partition(":")
+        if entry:
+            session.setdefault(section, {})[entry] = json.loads(value)
+        else:
+            session[section] = json.loads(value)
+    return session
+
+
+def get_section(session_id, section):
+    return get_session(session_id)[section]
+
+
+def delete_session(session_id):
+    store.delete(session_id)
+
+
+def save_job(job):
+    """Store a background job record, so any worker can report its status."""
+    store.set_field(JOB_KEY_PREFIX + job["job_id"], "job", _dumps(job))
+
+
+def get_job(job_id):
+    value = store.get_all(JOB_KEY_PREFIX + job_id).get("job")
+    return json.loads(value) if value is not None else None
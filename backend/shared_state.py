@@ -1,4 +0,0 @@
-stored_job_info = {}
-questions_generated = {}
-stored_audio_transcripts = {}    # 🆕 Store audio transcripts by timestamp
-stored_video_analysis = {}       # Already added for video analysis
@@ -0,0 +1,5 @@
+# Tests run from backend/ or the repository root; modules import from the backend directory
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
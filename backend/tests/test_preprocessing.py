@@ -0,0 +1,49 @@
+import numpy as np
+
+from AudioAnalyser.services.preprocessing import SAMPLE_RATE, speech_segments, trim_silence, to_original_time
+
+
+def tone(seconds, amplitude=0.3, frequency=220):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_continuous_tone_is_kept():
+    samples = tone(2.0)
+    segments = speech_segments(samples)
+    assert segments.tolist() == [[0, len(samples)]]
+
+
+def test_silence_alone_has_no_speech():
+    assert len(speech_segments(silence(2.0))) == 0
+
+
+def test_leading_trailing_and_long_silences_are_trimmed():
+    samples = np.concatenate([silence(1.0), tone(1.0), silence(3.0), tone(1.0), silence(1.0)])
+    trimmed, segments = trim_silence(samples)
+    assert len(segments) == 2
+    # Both tones survive, padded by at most VAD_PADDING_MS on each side
+    assert 2.0 <= len(trimmed) / SAMPLE_RATE <= 3.0
+    (first_start, first_end, _), (second_start, second_end, _) = segments
+    assert 0.7 <= first_start <= 1.0 and 2.0 <= first_end <= 2.3
+    assert 4.7 <= second_start <= 5.0 and 6.0 <= second_end <= 6.3
+
+
+def test_short_pause_is_kept():
+    samples = np.concatenate([tone(1.0), silence(0.3), tone(1.0)])
+    _, segments = trim_silence(samples)
+    assert len(segments) == 1
+
+
+def test_to_original_time_maps_through_segments():
+    samples = np.concatenate([silence(1.0), tone(1.0), silence(3.0), tone(1.0), silence(1.0)])
+    _, segments = trim_silence(samples)
+    first_start, first_end, _ = segments[0]
+    second_start, _, second_offset = segments[1]
+    assert to_original_time(0.5, segments) == first_start + 0.5
+    assert abs(to_original_time(second_offset + 0.5, segments) - (second_start + 0.5)) < 1e-9
+    assert to_original_time(1.0, []) == 1.0
@@ -0,0 +1,49 @@
+from ReportGeneration.Retriever import retriever
+from ReportGeneration.Retriever.hybrid import mmr, dedupe_overlaps
+
+
+class FakeBackend:
+    def __init__(self, hits):
+        self.hits = hits
+
+    def search(self, query_vector, top_k=5, filters=None):
+        return self.hits[:top_k]
+
+
+class NoKeywordIndex:
+    def available(self):
+        return False
+
+
+def _vector_hits(n):
+    return [{"chunk_id": f"c{i}", "text": f"chunk {i} about topic{i} and caching", "source": "a.pdf", "page": i}
+            for i in range(n)]
+
+
+def test_mmr_scores_unfused_hits_by_rank():
+    hits = dedupe_overlaps(_vector_hits(8))
+    picked = mmr(hits, 5)
+    assert len(picked) == 5
+    assert picked[0]["chunk_id"] == "c0"
+
+
+def test_vector_only_retrieval_with_mmr(monkeypatch):
+    monkeypatch.setattr(retriever, "RETRIEVER_MMR", True)
+    context = retriever.ContextRetriever(backend=FakeBackend(_vector_hits(8)), keyword_index=NoKeywordIndex())
+    hits = context.retrieve("caching", top_k=5, query_vector=[0.1, 0.2])
+    assert len(hits) == 5
+    assert hits[0]["chunk_id"] == "c0"
+    assert all("rrf_score" in hit for hit in hits)
+
+
+def test_vector_only_retrieval_keeps_rank_order(monkeypatch):
+    monkeypatch.setattr(retriever, "RETRIEVER_MMR", False)
+    context = retriever.ContextRetriever(backend=FakeBackend(_vector_hits(8)), keyword_index=NoKeywordIndex())
+    hits = context.retrieve("caching", top_k=3, query_vector=[0.1, 0.2])
+    assert [hit["chunk_id"] for hit in hits] == ["c0", "c1", "c2"]
+
+
+def test_retrievers_share_one_keyword_index():
+    first = retriever.ContextRetriever(backend=FakeBackend([]))
+    second = retriever.ContextRetriever(backend=FakeBackend([]))
+    assert first.keyword_index is second.keyword_index
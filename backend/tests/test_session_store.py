@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+import session_store
+from session_store import MemorySessionStore, SQLiteSessionStore, SessionTooLargeError
+
+SESSION = "abcdefgh1234"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    backend = MemorySessionStore() if request.param == "memory" else SQLiteSessionStore(str(tmp_path / "s.sqlite3"))
+    monkeypatch.setattr(session_store, "store", backend)
+    return backend
+
+
+def test_concurrent_updates_are_not_lost(store):
+    def work():
+        for _ in range(25):
+            session_store.update(SESSION, "count", lambda value: (value or 0) + 1)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert session_store.get_section(SESSION, "count") == 200
+
+
+def test_jobs_are_visible_to_other_store_instances(tmp_path, monkeypatch):
+    path = str(tmp_path / "s.sqlite3")
+    monkeypatch.setattr(session_store, "store", SQLiteSessionStore(path))
+    session_store.save_job({"job_id": "j1", "status": "queued"})
+    monkeypatch.setattr(session_store, "store", SQLiteSessionStore(path))
+    assert session_store.get_job("j1") == {"job_id": "j1", "status": "queued"}
+    assert session_store.get_job("missing") is None
+
+
+def test_size_limit_counts_bytes(store, monkeypatch):
+    monkeypatch.setattr(session_store, "SESSION_MAX_BYTES", 100)
+    # 40 characters, but 120 bytes in UTF-8
+    with pytest.raises(SessionTooLargeError):
+        session_store.save(SESSION, "notes", "€" * 40)
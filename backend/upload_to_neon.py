@@ -1,83 +1,216 @@
 # upload_to_neon.py
+#
+# Copies the Chroma knowledge base into Neon PostgreSQL (pgvector).
+# Pages through the collection, bulk-loads each page, upserts on the stable
+# chunk id so re-runs are idempotent, checkpoints progress so an interrupted
+# run resumes where it stopped, and builds the vector index once at the end.
+# A complete run also deletes rows whose chunks are gone from Chroma.
 
 import os
-import psycopg2
+import io
+import json
+import time
+import argparse
+
+import chromadb
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
-from langchain_chroma import Chroma
+
+from ReportGeneration.Retriever import pgvector_store
+from ReportGeneration.Retriever.pgvector_store import TABLE_NAME, vector_literal
 
 # Load environment variables from .env
 load_dotenv()
 
-# Step 1: Load ChromaDB
-print("📦 Loading ChromaDB collection...")
-chroma = Chroma(
-    persist_directory="C:/Users/bhati/OneDrive/Desktop/AI_Interview_Project/backend/chroma_db",
-    embedding_function=lambda x: x,  # dummy since we're not re-embedding
-    collection_name="my_document_embeddings"
-)
-
-collection = chroma._collection
-
-# Step 2: Extract data
-results = collection.get(include=["documents", "embeddings", "metadatas"])
-documents = results["documents"]
-embeddings = results["embeddings"]
-metadatas = results["metadatas"]
-
-print(f"🧠 Loaded {len(documents)} documents from ChromaDB")
-
-# Step 3: Connect to Neon PostgreSQL
-print("🔌 Connecting to Neon PostgreSQL...")
-try:
-    conn = psycopg2.connect(
-        dbname=os.getenv("PG_DB"),
-        user=os.getenv("PG_USER"),
-        password=os.getenv("PG_PASSWORD"),
-        host=os.getenv("PG_HOST"),
-        port=os.getenv("PG_PORT")
-    )
-    cursor = conn.cursor()
-except Exception as e:
-    print(f"❌ Failed to connect to PostgreSQL: {e}")
-    exit(1)
-
-# Step 4: Create table if not exists
-cursor.execute("""
-CREATE EXTENSION IF NOT EXISTS vector;
-CREATE TABLE IF NOT EXISTS pdf_embeddings (
-    id SERIAL PRIMARY KEY,
-    text TEXT NOT NULL,
-    embedding VECTOR,
-    source TEXT,
-    page INT
-);
-""")
-conn.commit()
-
-# Step 5: Insert documents
-print("⬆️ Uploading embeddings to Neon...")
-inserted = 0
-for doc, emb, meta in zip(documents, embeddings, metadatas):
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
+COLLECTION_NAME = "my_document_embeddings"
+CHECKPOINT_PATH = "upload_to_neon.checkpoint.json"
+
+UPSERT_COLUMNS = "chunk_id, text, embedding, source, page"
+UPSERT_CONFLICT = """
+    ON CONFLICT (chunk_id) DO UPDATE SET
+        text = EXCLUDED.text,
+        embedding = EXCLUDED.embedding,
+        source = EXCLUDED.source,
+        page = EXCLUDED.page
+"""
+
+
+def load_checkpoint(path, collection_name):
     try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("collection") == collection_name:
+            return checkpoint
+    except FileNotFoundError:
+        pass
+    return {"collection": collection_name, "offset": 0, "rows": 0}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def to_rows(batch):
+    rows = []
+    for chunk_id, doc, emb, meta in zip(batch["ids"], batch["documents"], batch["embeddings"], batch["metadatas"]):
         source = meta.get("source", "unknown") if meta else "unknown"
         page = meta.get("page", None) if meta else None
+        rows.append((chunk_id, doc, vector_literal(emb), source, page))
+    return rows
 
-        # Convert NumPy array to Python list
-        if hasattr(emb, "tolist"):
-            emb = emb.tolist()
 
-        cursor.execute(
-            "INSERT INTO pdf_embeddings (text, embedding, source, page) VALUES (%s, %s, %s, %s)",
-            (doc, emb, source, page)
-        )
-        inserted += 1
-    except Exception as e:
-        print(f"⚠️ Skipped one entry due to error: {e}")
-        continue
+def _copy_field(value):
+    # COPY text format: \N for NULL, backslash-escape the delimiters
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def upsert_with_copy(cursor, rows):
+    """COPY the page into a temp staging table, then upsert it in one statement."""
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS staging_embeddings
+        (LIKE {TABLE_NAME} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS;
+    """)
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_field(value) for value in row) + "\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY staging_embeddings ({UPSERT_COLUMNS}) FROM STDIN", buffer)
+    cursor.execute(f"""
+        INSERT INTO {TABLE_NAME} ({UPSERT_COLUMNS})
+        SELECT {UPSERT_COLUMNS} FROM staging_embeddings
+        {UPSERT_CONFLICT};
+    """)
+
+
+def upsert_with_values(cursor, rows):
+    execute_values(
+        cursor,
+        f"INSERT INTO {TABLE_NAME} ({UPSERT_COLUMNS}) VALUES %s {UPSERT_CONFLICT}",
+        rows,
+        template="(%s, %s, %s::vector, %s, %s)",
+        page_size=len(rows),
+    )
+
+
+def prune_missing(conn, keep_ids):
+    """Delete rows whose chunk is no longer in Chroma (and legacy rows without a chunk id)."""
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE keep_chunk_ids (chunk_id TEXT PRIMARY KEY) ON COMMIT DROP;")
+        buffer = io.StringIO("".join(_copy_field(chunk_id) + "\n" for chunk_id in keep_ids))
+        cursor.copy_expert("COPY keep_chunk_ids (chunk_id) FROM STDIN", buffer)
+        cursor.execute(f"""
+            DELETE FROM {TABLE_NAME} t
+            WHERE t.chunk_id IS NULL
+               OR NOT EXISTS (SELECT 1 FROM keep_chunk_ids k WHERE k.chunk_id = t.chunk_id);
+        """)
+        deleted = cursor.rowcount
+    conn.commit()
+    return deleted
+
 
+def drop_vector_indexes(conn):
+    # Inserting into an HNSW/IVFFlat index row by row is far slower than building it once
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {TABLE_NAME}_embedding_hnsw_idx;")
+        cursor.execute(f"DROP INDEX IF EXISTS {TABLE_NAME}_embedding_ivfflat_idx;")
+    conn.commit()
+
+
+def migrate(chroma_path, collection_name, batch_size, method, checkpoint_path, index_type):
+    # Step 1: Open the Chroma collection
+    print("📦 Opening ChromaDB collection...")
+    collection = chromadb.PersistentClient(path=chroma_path).get_collection(collection_name)
+    total = collection.count()
+    checkpoint = load_checkpoint(checkpoint_path, collection_name)
+    print(f"🧠 {total} documents in ChromaDB, resuming at offset {checkpoint['offset']}")
+
+    upsert = upsert_with_copy if method == "copy" else upsert_with_values
+
+    # Step 2: Connect to Neon PostgreSQL and prepare the table
+    print("🔌 Connecting to Neon PostgreSQL...")
+    with pgvector_store.connection() as conn:
+        pgvector_store.ensure_schema(conn)
+        if checkpoint["offset"] < total:
+            drop_vector_indexes(conn)
+
+        # Step 3: Page through the collection and bulk-load each page
+        print("⬆️ Uploading embeddings to Neon...")
+        started = time.perf_counter()
+        loaded = 0
+        # Only a run that saw the whole collection knows which rows are stale
+        full_run = checkpoint["offset"] == 0
+        seen_ids = []
+        while checkpoint["offset"] < total:
+            batch = collection.get(
+                include=["documents", "embeddings", "metadatas"],
+                limit=batch_size,
+                offset=checkpoint["offset"],
+            )
+            if not batch["ids"]:
+                break
+
+            seen_ids.extend(batch["ids"])
+            rows = to_rows(batch)
+            with conn.cursor() as cursor:
+                upsert(cursor, rows)
+            conn.commit()
+
+            loaded += len(rows)
+            checkpoint["offset"] += len(rows)
+            checkpoint["rows"] += len(rows)
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.perf_counter() - started
+            print(f"   {checkpoint['offset']}/{total} rows ({loaded / elapsed:,.0f} rows/sec)")
+
+        if full_run and seen_ids:
+            deleted = prune_missing(conn, seen_ids)
+            if deleted:
+                print(f"🧹 Removed {deleted} rows that are no longer in ChromaDB")
+
+        # Step 4: Build the vector index now that the data is in place
+        print(f"🧭 Building {index_type} index...")
+        index_started = time.perf_counter()
+        pgvector_store.ensure_index(conn, index_type)
+        print(f"   index ready in {time.perf_counter() - index_started:.1f}s")
+
+    # The checkpoint only exists to resume an interrupted run
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - started
+    rate = loaded / elapsed if elapsed else 0
+    print(f"✅ Upload to Neon DB complete! {loaded} rows this run in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load the Chroma knowledge base into Neon PostgreSQL.")
+    parser.add_argument("--chroma-path", default=CHROMA_PATH)
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--method", choices=["copy", "values"], default="copy",
+                        help="COPY into a staging table (default) or multi-row INSERT via execute_values")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    parser.add_argument("--index-type", default=pgvector_store.PG_INDEX_TYPE, choices=["hnsw", "ivfflat", "none"])
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    try:
+        migrate(args.chroma_path, args.collection, args.batch_size, args.method, args.checkpoint, args.index_type)
+    except Exception as e:
+        print(f"❌ Upload failed: {e}")
+        exit(1)
 
-conn.commit()
-cursor.close()
-conn.close()
 
-print(f"✅ Upload to Neon DB complete! Total uploaded: {inserted}")
+if __name__ == "__main__":
+    main()
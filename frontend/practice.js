@@ -313,7 +313,11 @@ class PracticeFormHandler {
         
         try {
             // Simulate API call (replace with actual endpoint)
-            await this.submitToAPI(formData);
+            const result = await this.submitToAPI(formData);
+            // Every later request identifies this interview by its session ID
+            if (result.session_id) {
+                localStorage.setItem('aceNextSessionId', result.session_id);
+            }
             
             // Clear saved data
             localStorage.removeItem('aceNextPracticeForm');
@@ -364,6 +368,8 @@ class PracticeFormHandler {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                // Reuse the current session when the form is resubmitted
+                ...(localStorage.getItem('aceNextSessionId') ? { 'X-Session-ID': localStorage.getItem('aceNextSessionId') } : {})
             },
             body: JSON.stringify(data)
         });
@@ -84,48 +84,96 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     }
 
-    async function generateReport() {
+    // Titles for the fields of the report object, in the order the model writes them
+    const fieldTitles = {
+        summary: 'Summary',
+        technical_feedback: 'Technical Feedback',
+        behavioral_feedback: 'Behavioral Feedback',
+        communication_feedback: 'Communication Feedback',
+        suggestions: 'Suggestions'
+    };
+
+    function generateReport() {
         // Reset UI state
         hideAllSections();
+        formattedReport.innerHTML = '';
+        reportText.textContent = '';
         loading.classList.remove("hidden");
         generateBtn.disabled = true;
         
         // Update button state
         updateButtonState(generateBtn, 'loading');
         
-        // Simulate loading steps
-        await simulateLoadingSteps();
-
-        try {
-            const response = await fetch("http://localhost:8000/generate-report");
-            const data = await response.json();
-
-            if (response.ok && data.report) {
-                // Populate raw report
-                reportText.textContent = data.report;
-                
-                // Generate formatted report
-                generateFormattedReport(data.report);
-                
-                // Update overall score with animation
-                animateOverallScore(88); // Example score
-                
-                // Show success state
-                showReportContainer();
-                showNotification('✅ Report generated successfully!', 'success');
-                
-            } else {
-                throw new Error(data.message || "Failed to fetch report.");
-            }
-        } catch (error) {
-            console.error('Report generation error:', error);
-            showError(error.message);
-            showNotification('❌ Failed to generate report', 'error');
-        } finally {
+        // Loading steps animate while the report streams in
+        simulateLoadingSteps();
+
+        const sessionId = localStorage.getItem("aceNextSessionId") || "";
+        const events = new EventSource(`http://localhost:8000/generate-report/stream?session_id=${encodeURIComponent(sessionId)}`);
+        const received = {};
+
+        const finish = () => {
+            events.close();
             loading.classList.add("hidden");
             generateBtn.disabled = false;
             updateButtonState(generateBtn, 'normal');
-        }
+        };
+
+        // Each report field is shown as soon as the server has generated it
+        events.addEventListener('field', e => {
+            const { name, value } = JSON.parse(e.data);
+            if (!Object.keys(received).length) {
+                loading.classList.add("hidden");
+                showReportContainer();
+            }
+            received[name] = value;
+            appendReportSection(name, value);
+            reportText.textContent = JSON.stringify(received, null, 2);
+        });
+
+        events.addEventListener('report', e => {
+            const report = JSON.parse(e.data);
+            reportText.textContent = JSON.stringify(report, null, 2);
+            if (!Object.keys(received).length) {
+                Object.entries(report).forEach(([name, value]) => appendReportSection(name, value));
+                showReportContainer();
+            }
+            
+            // Update overall score with animation
+            animateOverallScore(88); // Example score
+            
+            showNotification('✅ Report generated successfully!', 'success');
+            finish();
+        });
+
+        events.addEventListener('error', e => {
+            // Server-sent "error" events carry a message; a bare error means the connection failed
+            const message = e.data ? JSON.parse(e.data) : "Failed to fetch report.";
+            console.error('Report generation error:', message);
+            showError(message);
+            showNotification('❌ Failed to generate report', 'error');
+            finish();
+        });
+    }
+
+    function appendReportSection(name, value) {
+        const section = document.createElement('div');
+        section.className = 'report-section-formatted';
+
+        const title = document.createElement('h4');
+        title.className = 'section-title';
+        title.textContent = fieldTitles[name] || name;
+
+        const body = document.createElement('div');
+        body.className = 'section-body';
+        const lines = Array.isArray(value) ? value : String(value).split('\n');
+        lines.filter(line => String(line).trim()).forEach(line => {
+            const p = document.createElement('p');
+            p.textContent = String(line).trim();
+            body.appendChild(p);
+        });
+
+        section.append(title, body);
+        formattedReport.appendChild(section);
     }
 
     function simulateLoadingSteps() {
@@ -150,60 +198,6 @@ document.addEventListener("DOMContentLoaded", () => {
         });
     }
 
-    function generateFormattedReport(rawReportText) {
-        // Parse and format the raw report into structured HTML
-        const sections = parseReportSections(rawReportText);
-        
-        let formattedHTML = '';
-        
-        sections.forEach(section => {
-            formattedHTML += `
-                <div class="report-section-formatted">
-                    <h4 class="section-title">${section.title}</h4>
-                    <div class="section-body">
-                        ${section.content.split('\n').map(line => 
-                            line.trim() ? `<p>${line.trim()}</p>` : ''
-                        ).join('')}
-                    </div>
-                </div>
-            `;
-        });
-        
-        formattedReport.innerHTML = formattedHTML;
-    }
-
-    function parseReportSections(reportText) {
-        // Simple parser to extract sections from the report
-        const sections = [];
-        const lines = reportText.split('\n');
-        let currentSection = null;
-        
-        lines.forEach(line => {
-            line = line.trim();
-            if (line.match(/^[A-Z][^:]*:$/)) {
-                // This looks like a section header
-                if (currentSection) {
-                    sections.push(currentSection);
-                }
-                currentSection = {
-                    title: line.replace(':', ''),
-                    content: ''
-                };
-            } else if (currentSection && line) {
-                currentSection.content += line + '\n';
-            }
-        });
-        
-        if (currentSection) {
-            sections.push(currentSection);
-        }
-        
-        return sections.length > 0 ? sections : [{
-            title: 'Interview Analysis',
-            content: reportText
-        }];
-    }
-
     function animateOverallScore(targetScore) {
         let currentScore = 0;
         const increment = targetScore / 50;
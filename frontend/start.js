@@ -4,6 +4,7 @@ let audioChunks = [];
 let isRecording = false;
 let videoStream;
 let emotionInterval;
+let emotionSocket;
 let sessionStartTime;
 let timerInterval;
 let currentQuestions = [];
@@ -11,6 +12,10 @@ let audioProcessed = false;
 let videoProcessed = false;
 let selectedQuestionIndex = -1;
 
+// Session created by the practice form; the backend keeps this interview's state under it
+const sessionId = localStorage.getItem('aceNextSessionId') || '';
+const sessionHeaders = { 'X-Session-ID': sessionId };
+
 // Sample questions for fallback
 const sampleQuestions = {
     technical: [
@@ -54,7 +59,7 @@ async function initializeSession() {
 // Load candidate + job info
 async function loadJobInfo() {
     try {
-        const res = await fetch('http://localhost:8000/get-job-info');
+        const res = await fetch('http://localhost:8000/get-job-info', { headers: sessionHeaders });
         const data = await res.json();
 
         const { candidate_name, job_role, company_name } = data.job_info || {};
@@ -87,7 +92,7 @@ async function generateQuestions() {
         // Try to fetch from backend first
         let questions = [];
         try {
-            const res = await fetch(`http://localhost:8000/generate-problems?category=${category}`);
+            const res = await fetch(`http://localhost:8000/generate-problems?category=${category}`, { headers: sessionHeaders });
             const data = await res.json();
             questions = data.questions || [];
         } catch (backendError) {
@@ -270,6 +275,10 @@ function endInterview() {
     if (emotionInterval) {
         clearInterval(emotionInterval);
     }
+
+    if (emotionSocket) {
+        emotionSocket.close();
+    }
     
     if (timerInterval) {
         clearInterval(timerInterval);
@@ -288,7 +297,8 @@ async function generateReport() {
         const response = await fetch('http://localhost:8000/generate-report', {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                ...sessionHeaders
             },
             body: JSON.stringify({
                 sessionDuration: Date.now() - sessionStartTime,
@@ -431,16 +441,23 @@ async function uploadAudio(audioBlob) {
     try {
         const response = await fetch('http://localhost:8000/upload', {
             method: 'POST',
+            headers: sessionHeaders,
             body: formData
         });
         
-        if (response.ok) {
-            audioProcessed = true;
-            updateProcessingStatus();
-            showNotification('✅ Audio uploaded and processed', 'success');
-        } else {
+        if (!response.ok) {
+            throw new Error('Upload failed');
+        }
+
+        const { job_id } = await response.json();
+        if (!job_id) {
             throw new Error('Upload failed');
         }
+        showNotification('📤 Audio uploaded, transcribing...', 'info');
+        await waitForTranscription(job_id);
+        audioProcessed = true;
+        updateProcessingStatus();
+        showNotification('✅ Audio uploaded and processed', 'success');
     } catch (err) {
         console.error('Audio upload error:', err);
         // Simulate processing even if upload fails
@@ -452,13 +469,34 @@ async function uploadAudio(audioBlob) {
     }
 }
 
+// Follow the background transcription job until it finishes
+function waitForTranscription(jobId) {
+    return new Promise((resolve, reject) => {
+        const events = new EventSource(`http://localhost:8000/upload/${jobId}/events?session_id=${encodeURIComponent(sessionId)}`);
+        events.addEventListener('completed', e => {
+            events.close();
+            resolve(JSON.parse(e.data));
+        });
+        events.addEventListener('error', e => {
+            events.close();
+            reject(new Error(e.data ? JSON.parse(e.data).error : 'Transcription failed'));
+        });
+    });
+}
+
 // Webcam + Emotion
 async function startLiveVideo() {
     const videoElement = document.getElementById('liveVideo');
     try {
         videoStream = await navigator.mediaDevices.getUserMedia({ video: true });
         videoElement.srcObject = videoStream;
-        emotionInterval = setInterval(captureAndSendFrame, 5000);
+        openEmotionSocket();
+        // Frames go over the WebSocket once a second; the HTTP fallback keeps the old 5s pace
+        let tick = 0;
+        emotionInterval = setInterval(() => {
+            const socketOpen = emotionSocket && emotionSocket.readyState === WebSocket.OPEN;
+            if (socketOpen || tick++ % 5 === 0) captureAndSendFrame();
+        }, 1000);
         
         // Simulate video processing after delay
         setTimeout(() => {
@@ -474,6 +512,28 @@ async function startLiveVideo() {
     }
 }
 
+// Live emotion stream: binary JPEG frames up, JSON results down
+function openEmotionSocket() {
+    emotionSocket = new WebSocket(`ws://localhost:8000/ws/analyze-video?session_id=${encodeURIComponent(sessionId)}`);
+    emotionSocket.binaryType = 'arraybuffer';
+
+    emotionSocket.onmessage = event => {
+        const data = JSON.parse(event.data);
+        if (data.type !== 'emotions') return;
+        const latest = data.results.filter(r => r.emotion).pop();
+        if (latest) {
+            updateEmotionDisplay(`${getEmotionEmoji(latest.emotion)} ${latest.emotion}`);
+        }
+    };
+
+    emotionSocket.onclose = () => {
+        // Reconnect while the camera is still running
+        if (videoStream && videoStream.active) {
+            setTimeout(openEmotionSocket, 3000);
+        }
+    };
+}
+
 async function captureAndSendFrame() {
     const video = document.getElementById('liveVideo');
     if (!video.videoWidth) return;
@@ -484,12 +544,18 @@ async function captureAndSendFrame() {
     canvas.getContext('2d').drawImage(video, 0, 0);
 
     canvas.toBlob(async blob => {
+        if (emotionSocket && emotionSocket.readyState === WebSocket.OPEN) {
+            emotionSocket.send(blob);
+            return;
+        }
+
         const formData = new FormData();
         formData.append('video', blob, 'frame.jpg');
 
         try {
             const response = await fetch('http://localhost:8000/analyze-video', {
                 method: 'POST',
+                headers: sessionHeaders,
                 body: formData
             });
             